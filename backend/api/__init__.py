@@ -8,6 +8,7 @@ from flask_migrate import Migrate
 from flask.cli import with_appcontext
 import click
 from .config import Config
+from .sqlite_tuning import is_sqlite_file, engine_options, install_pragmas
 
 db = SQLAlchemy()
 migrate = Migrate()
@@ -27,8 +28,14 @@ def create_app():
     # Load the app configurations
     app.config.from_object(Config)
     Config.init_app(app)
+    managed_sqlite = Config.SQLITE_MANAGED and is_sqlite_file(app.config['SQLALCHEMY_DATABASE_URI'])
+    if managed_sqlite:
+        app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {**engine_options(), **app.config.get('SQLALCHEMY_ENGINE_OPTIONS', {})}
     # Initialize SQLAlchemy with the app
     db.init_app(app)
+    if managed_sqlite:
+        with app.app_context():
+            install_pragmas(db.engine)
     # Initialize Flask-Migrate
     migrate.init_app(app, db)
     # Initialize CORS and session
@@ -61,5 +68,21 @@ def init_db_command():
     click.echo('Initialized the database.')
     logger.info("SurveyData table created")
 
+@click.command('gc-blobs')
+@with_appcontext
+def gc_blobs_command():
+    from .models import ContentBlob
+    removed = ContentBlob.collect_garbage()
+    click.echo(f'Removed {removed} unreferenced content blobs.')
+
+@click.command('clear-config-cache')
+@with_appcontext
+def clear_config_cache_command():
+    from .create_question_config import invalidate_cached_config
+    removed = invalidate_cached_config()
+    click.echo(f'Removed {removed} cached question configs.')
+
 def init_app(app):
-    app.cli.add_command(init_db_command)
\ No newline at end of file
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(gc_blobs_command)
+    app.cli.add_command(clear_config_cache_command)
\ No newline at end of file
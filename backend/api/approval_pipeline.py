@@ -0,0 +1,55 @@
+import logging
+from contextlib import nullcontext
+from . import create_question_config, conduct_survey, create_survey_analysis
+from .models import SurveyData
+from .pipeline import Pipeline, Stage
+from .config import Config
+from .unit_of_work import unit_of_work
+
+logger = logging.getLogger('voxbox')
+
+
+def build_approval_pipeline(user_id, session_id, seed=None, on_analysis_event=None):
+    # question_config -> survey_results -> {save_results, analysis}; the last two run concurrently
+    def question_config_stage(inputs):
+        question_config = create_question_config.main(user_id, session_id)
+        if not question_config:
+            logger.warning("Failed to generate question config")
+            question_config = {"error": "Failed to generate question config"}
+        return question_config
+
+    def survey_stage(inputs):
+        return conduct_survey.conduct_single_question_survey(user_id, session_id, seed=seed)
+
+    def save_results_stage(inputs):
+        SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='survey_results', content=inputs['survey_results'])
+        logger.info(f"Saved survey results to database for user {user_id}, session {session_id}")
+
+    def analysis_stage(inputs):
+        analysis_result = create_survey_analysis.main(user_id, session_id, on_analysis_event)
+        if not analysis_result:
+            logger.warning("Failed to generate analysis")
+            analysis_result = create_survey_analysis.create_default_analysis()
+        return analysis_result
+
+    return Pipeline([
+        Stage('question_config', question_config_stage),
+        Stage('survey_results', survey_stage, deps=['question_config']),
+        Stage('save_results', save_results_stage, deps=['survey_results']),
+        Stage('analysis', analysis_stage, deps=['survey_results']),
+    ])
+
+
+def run_approval_pipeline(app, user_id, session_id, transformed_question, seed=None, on_stage_done=None,
+                          on_analysis_event=None):
+    # All SurveyData writes of the run go out in one transaction when it ends
+    with unit_of_work() if Config.SURVEY_DATA_UNIT_OF_WORK else nullcontext():
+        results, timings = build_approval_pipeline(user_id, session_id, seed, on_analysis_event).run(app, on_stage_done)
+    logger.info(f"Approved question for user {user_id}, session {session_id}: {transformed_question}")
+    return {
+        "approved_question": transformed_question,
+        "question_config": results['question_config'],
+        "survey_results": results['survey_results'],
+        "analysis": results['analysis'],
+        "timings": {stage: round(seconds, 3) for stage, seconds in timings.items()}
+    }
@@ -0,0 +1,190 @@
+import time
+import logging
+import threading
+from .config import Config
+from .openai_client import get_client
+
+logger = logging.getLogger(__name__)
+
+PENDING_STATUSES = {"queued", "in_progress", "cancelling"}
+FAILED_STATUSES = {"failed", "expired", "cancelled", "incomplete"}
+
+# Assistant definitions (model, instructions) fetched once per process for the chat completions path
+_assistants = {}
+_assistants_lock = threading.Lock()
+
+
+class AssistantRunError(Exception):
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+def _cancel_quietly(client, thread_id, run_id):
+    try:
+        client.beta.threads.runs.cancel(thread_id=thread_id, run_id=run_id)
+    except Exception as e:
+        logger.warning(f"Could not cancel run {run_id}: {str(e)}")
+
+
+def wait_for_run(client, thread_id, run, timeout=None):
+    """Poll a run with exponential backoff until it reaches a terminal state.
+
+    Returns the completed run. Raises AssistantRunError when the run fails,
+    expires, is cancelled, asks for tool output, or outlives ``timeout``; in the
+    last two cases the run is cancelled first so it stops consuming tokens.
+    """
+    if timeout is None:
+        timeout = Config.ASSISTANT_RUN_TIMEOUT
+    deadline = time.monotonic() + timeout
+    delay = Config.ASSISTANT_POLL_INITIAL_DELAY
+    while run.status in PENDING_STATUSES:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            _cancel_quietly(client, thread_id, run.id)
+            raise AssistantRunError(f"Run {run.id} timed out after {timeout}s", status="timeout")
+        time.sleep(min(delay, remaining))
+        delay = min(delay * Config.ASSISTANT_POLL_BACKOFF, Config.ASSISTANT_POLL_MAX_DELAY)
+        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run.id)
+
+    if run.status == "completed":
+        return run
+    if run.status == "requires_action":
+        _cancel_quietly(client, thread_id, run.id)
+        raise AssistantRunError(f"Run {run.id} requested tool output, which is not supported", status=run.status)
+    last_error = getattr(run, "last_error", None)
+    detail = f": {last_error.message}" if last_error else ""
+    raise AssistantRunError(f"Run {run.id} ended with status {run.status}{detail}", status=run.status)
+
+
+def _delete_thread_quietly(client, thread_id):
+    try:
+        client.beta.threads.delete(thread_id)
+    except Exception as e:
+        logger.warning(f"Could not delete thread {thread_id}: {str(e)}")
+
+
+def _run_on_thread(client, assistant_id, prompt, timeout):
+    # The thread is created with the prompt already in it, saving a round trip
+    thread = client.beta.threads.create(messages=[{"role": "user", "content": prompt}])
+    try:
+        run = client.beta.threads.runs.create(thread_id=thread.id, assistant_id=assistant_id)
+        run = wait_for_run(client, thread.id, run, timeout)
+        messages = client.beta.threads.messages.list(thread_id=thread.id, order="desc", limit=1)
+        if not messages.data or not messages.data[0].content or not messages.data[0].content[0].text.value:
+            raise ValueError("Invalid response received from API")
+        return messages.data[0].content[0].text.value, getattr(run, "usage", None)
+    finally:
+        if Config.OPENAI_DELETE_THREADS:
+            _delete_thread_quietly(client, thread.id)
+
+
+def get_assistant(client, assistant_id):
+    assistant = _assistants.get(assistant_id)
+    if assistant is None:
+        assistant = client.beta.assistants.retrieve(assistant_id)
+        with _assistants_lock:
+            _assistants[assistant_id] = assistant
+    return assistant
+
+
+def _run_as_chat(client, assistant_id, prompt, timeout):
+    # Same model and instructions as the assistant, in a single request
+    assistant = get_assistant(client, assistant_id)
+    messages = [{"role": "user", "content": prompt}]
+    if assistant.instructions:
+        messages.insert(0, {"role": "system", "content": assistant.instructions})
+    kwargs = {}
+    if getattr(assistant, "temperature", None) is not None:
+        kwargs["temperature"] = assistant.temperature
+    completion = client.chat.completions.create(model=assistant.model, messages=messages, timeout=timeout, **kwargs)
+    text = completion.choices[0].message.content if completion.choices else None
+    if not text:
+        raise ValueError("Invalid response received from API")
+    return text, completion.usage
+
+
+def run_assistant_with_usage(assistant_id, prompt, timeout=None, client=None):
+    client = client or get_client()
+    if timeout is None:
+        timeout = Config.ASSISTANT_RUN_TIMEOUT
+    started = time.monotonic()
+    if Config.OPENAI_USE_CHAT_COMPLETIONS:
+        text, usage = _run_as_chat(client, assistant_id, prompt, timeout)
+    else:
+        text, usage = _run_on_thread(client, assistant_id, prompt, timeout)
+    logger.info(f"Assistant {assistant_id} answered in {time.monotonic() - started:.2f}s")
+    return text, usage
+
+
+def run_assistant(assistant_id, prompt, timeout=None, client=None):
+    return run_assistant_with_usage(assistant_id, prompt, timeout, client)[0]
+
+
+def _stream_on_thread(client, assistant_id, prompt, timeout):
+    thread = client.beta.threads.create(messages=[{"role": "user", "content": prompt}])
+    deadline = time.monotonic() + timeout
+    run_id, usage = None, None
+    try:
+        with client.beta.threads.runs.create(thread_id=thread.id, assistant_id=assistant_id, stream=True) as events:
+            for event in events:
+                if event.event == "thread.run.created":
+                    run_id = event.data.id
+                elif event.event == "thread.message.delta":
+                    for part in event.data.delta.content or []:
+                        if part.type == "text" and part.text and part.text.value:
+                            yield part.text.value
+                elif event.event == "thread.run.completed":
+                    usage = event.data.usage
+                elif event.event == "thread.run.requires_action":
+                    _cancel_quietly(client, thread.id, run_id)
+                    raise AssistantRunError(f"Run {run_id} requested tool output, which is not supported", status="requires_action")
+                elif event.event in ("thread.run.failed", "thread.run.cancelled", "thread.run.expired", "thread.run.incomplete"):
+                    last_error = getattr(event.data, "last_error", None)
+                    detail = f": {last_error.message}" if last_error else ""
+                    raise AssistantRunError(f"Run {run_id} ended with status {event.data.status}{detail}", status=event.data.status)
+                elif event.event == "error":
+                    raise AssistantRunError(f"Run {run_id} stream failed: {event.data.message}", status="error")
+                if time.monotonic() > deadline:
+                    if run_id:
+                        _cancel_quietly(client, thread.id, run_id)
+                    raise AssistantRunError(f"Run {run_id} timed out after {timeout}s", status="timeout")
+    finally:
+        if Config.OPENAI_DELETE_THREADS:
+            _delete_thread_quietly(client, thread.id)
+    return usage
+
+
+def _stream_as_chat(client, assistant_id, prompt, timeout):
+    assistant = get_assistant(client, assistant_id)
+    messages = [{"role": "user", "content": prompt}]
+    if assistant.instructions:
+        messages.insert(0, {"role": "system", "content": assistant.instructions})
+    kwargs = {}
+    if getattr(assistant, "temperature", None) is not None:
+        kwargs["temperature"] = assistant.temperature
+    usage = None
+    with client.chat.completions.create(model=assistant.model, messages=messages, timeout=timeout, stream=True,
+                                        stream_options={"include_usage": True}, **kwargs) as chunks:
+        for chunk in chunks:
+            if getattr(chunk, "usage", None):
+                usage = chunk.usage
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+    return usage
+
+
+def stream_assistant(assistant_id, prompt, timeout=None, client=None):
+    """Yield the assistant's answer as text deltas while it is generated.
+
+    The generator's return value is the usage block, or None. Failures and
+    timeouts raise AssistantRunError as in ``run_assistant``.
+    """
+    client = client or get_client()
+    if timeout is None:
+        timeout = Config.ASSISTANT_RUN_TIMEOUT
+    if Config.OPENAI_USE_CHAT_COMPLETIONS:
+        usage = yield from _stream_as_chat(client, assistant_id, prompt, timeout)
+    else:
+        usage = yield from _stream_on_thread(client, assistant_id, prompt, timeout)
+    return usage
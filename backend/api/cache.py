@@ -0,0 +1,126 @@
+import json
+import hashlib
+import logging
+import threading
+import unicodedata
+import re
+from datetime import datetime, timedelta
+from sqlalchemy.exc import IntegrityError
+from . import db
+from .models import CacheEntry
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text):
+    # Case, spacing, quotes and trailing punctuation do not change what a question asks
+    text = unicodedata.normalize('NFKC', str(text)).lower()
+    text = re.sub(r'\s+', ' ', text).strip()
+    return text.strip('"\'“”‘’ ').rstrip('?!. ')
+
+
+def fingerprint(value):
+    if not isinstance(value, str):
+        value = json.dumps(value, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(value.encode('utf-8')).hexdigest()
+
+
+class PersistentCache:
+    """LRU + TTL cache stored in the CacheEntry table.
+
+    Living in the database, entries survive restarts and are shared by every
+    worker. Hit and miss counters are per process; ``stats`` also reports the
+    persisted per-entry hit totals.
+    """
+
+    def __init__(self, namespace, max_entries, ttl_seconds):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _count(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key):
+        try:
+            entry = CacheEntry.query.filter_by(namespace=self.namespace, key=key).first()
+            now = datetime.utcnow()
+            if entry is None or entry.created_at < now - self.ttl:
+                self._count(False)
+                return None
+            entry.hits += 1
+            entry.last_used_at = now
+            db.session.commit()
+            self._count(True)
+            return json.loads(entry.content)
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Cache read failed for {self.namespace}: {str(e)}")
+            self._count(False)
+            return None
+
+    def set(self, key, value):
+        content = json.dumps(value)
+        now = datetime.utcnow()
+        try:
+            entry = CacheEntry.query.filter_by(namespace=self.namespace, key=key).first()
+            if entry is None:
+                db.session.add(CacheEntry(namespace=self.namespace, key=key, content=content,
+                                          created_at=now, last_used_at=now, hits=0))
+            else:
+                entry.content = content
+                entry.created_at = now
+                entry.last_used_at = now
+            db.session.commit()
+        except IntegrityError:
+            # Another worker stored the same key first; theirs is just as good
+            db.session.rollback()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Cache write failed for {self.namespace}: {str(e)}")
+            return
+        self.evict()
+
+    def evict(self):
+        try:
+            query = CacheEntry.query.filter_by(namespace=self.namespace)
+            expired = query.filter(CacheEntry.created_at < datetime.utcnow() - self.ttl).delete(synchronize_session=False)
+            overflow = query.count() - self.max_entries
+            if overflow > 0:
+                oldest = [row.id for row in query.order_by(CacheEntry.last_used_at.asc()).limit(overflow).with_entities(CacheEntry.id)]
+                CacheEntry.query.filter(CacheEntry.id.in_(oldest)).delete(synchronize_session=False)
+            db.session.commit()
+            if expired or overflow > 0:
+                logger.info(f"Cache {self.namespace}: evicted {expired} expired and {max(overflow, 0)} least recently used entries")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Cache eviction failed for {self.namespace}: {str(e)}")
+
+    def invalidate(self, key=None):
+        # Drops one key, or the whole namespace when no key is given
+        query = CacheEntry.query.filter_by(namespace=self.namespace)
+        if key is not None:
+            query = query.filter_by(key=key)
+        removed = query.delete(synchronize_session=False)
+        db.session.commit()
+        return removed
+
+    def stats(self):
+        query = CacheEntry.query.filter_by(namespace=self.namespace)
+        lookups = self.hits + self.misses
+        return {
+            "entries": query.count(),
+            "max_entries": self.max_entries,
+            "ttl_seconds": int(self.ttl.total_seconds()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else None,
+            "persisted_hits": int(query.with_entities(db.func.coalesce(db.func.sum(CacheEntry.hits), 0)).scalar())
+        }
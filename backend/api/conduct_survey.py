@@ -1,28 +1,27 @@
 import pandas as pd
 import numpy as np
-import random
 import logging
-import json
-from typing import List, Dict, Any
+from typing import Dict, Any
 from .config import Config
 from .models import SurveyData
-import os
+from .profile_store import ProfileStore, get_profile_store
+from .response_engine import CompiledQuestionConfig, compile_question_config
+from .weighting import calculate_weights, load_census_targets
+from .strata import quota_sample
+from .packed_responses import pack_responses
+from .uncertainty import add_margins_of_error
+from .crosstabs import CrosstabAccumulator, weighted_crosstabs
+from .create_question_config import DEMOGRAPHIC_VARIABLES
+from .seeding import new_run_seed, run_streams, generator, chunk_generators, SAMPLE_STREAM, RESPONSE_STREAM, BOOTSTRAP_STREAM
+from .response_sampler import question_options, uniform_probabilities, sample_choices, weighted_counts, ResponseReservoir
 
 # Set up logging
 logging.basicConfig(level=logging.INFO,
                     format='%(asctime)s - %(levelname)s - %(message)s')
 
-# Ensure reproducibility
-RANDOM_SEED = 42
-random.seed(RANDOM_SEED)
-np.random.seed(RANDOM_SEED)
-
 def load_data() -> pd.DataFrame:
     try:
-        file_path = os.path.join(os.path.dirname(__file__), '..', 'data', 'american_profiles_2024.json')
-        with open(file_path, 'r') as file:
-            profiles_data = json.load(file)
-        profiles_df = pd.DataFrame(profiles_data)
+        profiles_df = get_profile_store().to_frame()
         logging.info("Data loaded successfully")
         return profiles_df
     except Exception as e:
@@ -39,99 +38,142 @@ def load_approved_question(user_id, session_id):
         logging.error(f"Error loading latest question: {str(e)}")
         raise
 
-def simulate_response(row: pd.Series, question: Dict[str, Any]) -> str:
-    options = question.get('options', {})
-    
-    if isinstance(options, dict):
-        option_list = list(options.values())
-    elif isinstance(options, list):
-        option_list = options
-    else:
-        logging.error(f"Unexpected options type: {type(options)}")
-        return "Error: Invalid options"
-    
-    if not option_list:
-        logging.error("No valid options found in the question")
-        return "No Answer"
-    
-    weights = [1/len(option_list)] * len(option_list)  # Equal weights for simplicity
-    
-    # Log options and weights only once at DEBUG level
-    logging.debug(f"Options: {options}")
-    logging.debug(f"Weights: {weights}")
-    
-    try:
-        return random.choices(option_list, weights=weights)[0]
-    except Exception as e:
-        logging.error(f"Error in simulate_response: {str(e)}")
-        logging.error(f"Question structure: {question}")
-        return "Error"
+def draw_sample(store: ProfileStore, num_respondents: int, compiled_config: CompiledQuestionConfig,
+                rng: np.random.Generator) -> np.ndarray:
+    if Config.SAMPLING_MODE == 'quota':
+        if Config.QUOTA_SOURCE == 'question_config' and compiled_config.composition:
+            targets = {variable: dict(zip(DEMOGRAPHIC_VARIABLES[variable], weights))
+                       for variable, weights in compiled_config.composition.items()}
+            return quota_sample(store, num_respondents, targets, rng=rng)
+        return quota_sample(store, num_respondents, load_census_targets(), Config.QUOTA_VARIABLES, rng=rng)
+    return rng.integers(0, len(store), size=num_respondents)
 
-def calculate_weighted_results(responses: List[Dict[str, Any]], question: Dict[str, Any]) -> Dict[str, Any]:
-    weighted_responses = {}
-    total_weight = 0
-    
-    for response in responses:
-        answer = response['response']
-        weight = response['weight']
-        weighted_responses[answer] = weighted_responses.get(answer, 0) + weight
-        total_weight += weight
-    
-    percentages = {k: (v / total_weight * 100) for k, v in weighted_responses.items()}
-    options = question.get('options', {})
-    
-    if isinstance(options, dict):
-        answer_mapping = {v: k for k, v in options.items()}
+def simulate_responses(store: ProfileStore, rows: np.ndarray, question: Dict[str, Any],
+                       compiled_config: CompiledQuestionConfig, rng: np.random.Generator) -> np.ndarray:
+    labels, texts = question_options(question)
+    if not texts:
+        raise ValueError("No valid options found in the question")
+
+    if compiled_config is not None and compiled_config.conditions_responses:
+        probabilities = compiled_config.probabilities(store, rows)
     else:
-        answer_mapping = {opt: opt for opt in options}
-    
+        probabilities = uniform_probabilities(len(rows), len(texts))
+    logging.debug(f"Options: {texts}")
+    return sample_choices(probabilities, rng)
+
+def format_weighted_results(weighted_responses: np.ndarray, question: Dict[str, Any]) -> Dict[str, Any]:
+    labels, texts = question_options(question)
+    total_weight = weighted_responses.sum()
+    percentages = weighted_responses / total_weight * 100 if total_weight else np.zeros(len(texts))
+
     result = {
         'question': question['question'],
         'type': question['type'],
-        'answers': [{'text': k, 'label': answer_mapping.get(k, k), 'percentage': v} for k, v in percentages.items()]
+        'answers': [{'text': text, 'label': label, 'percentage': float(pct)}
+                    for text, label, pct in zip(texts, labels, percentages)]
     }
-    
+
     return result
 
-def conduct_single_question_survey(user_id, session_id, num_respondents=None):
+def calculate_weighted_results(codes: np.ndarray, weights: np.ndarray, question: Dict[str, Any],
+                               rng: np.random.Generator) -> Dict[str, Any]:
+    _, texts = question_options(question)
+    tally = weighted_counts(codes, weights, len(texts))
+    result = format_weighted_results(tally, question)
+    return add_margins_of_error(result, tally, len(codes), weights.sum(), np.square(weights).sum(), rng)
+
+def build_individual_responses(store: ProfileStore, rows: np.ndarray, codes: np.ndarray,
+                               weights: np.ndarray, question: Dict[str, Any]) -> Dict[str, Any]:
+    # Stored packed; demographics are rehydrated from the profile store only when asked for
+    _, texts = question_options(question)
+    return pack_responses(store, rows, codes, weights, texts)
+
+def simulate_survey(store: ProfileStore, question: Dict[str, Any], compiled_config: CompiledQuestionConfig,
+                    num_respondents: int, seed: int) -> Dict[str, Any]:
+    streams = run_streams(seed)
+    sample_rows = draw_sample(store, num_respondents, compiled_config, generator(streams[SAMPLE_STREAM]))
+    codes = simulate_responses(store, sample_rows, question, compiled_config, generator(streams[RESPONSE_STREAM]))
+    weights = calculate_weights(store, sample_rows)
+    _, texts = question_options(question)
+    return {
+        "seed": seed,
+        "aggregate_results": calculate_weighted_results(codes, weights, question, generator(streams[BOOTSTRAP_STREAM])),
+        "crosstabs": weighted_crosstabs(store, sample_rows, codes, weights, texts),
+        "individual_responses": build_individual_responses(store, sample_rows, codes, weights, question)
+    }
+
+def stream_survey(store: ProfileStore, question: Dict[str, Any], compiled_config: CompiledQuestionConfig,
+                  num_respondents: int, seed: int, chunk_size: int = None, reservoir_size: int = None) -> Dict[str, Any]:
+    if chunk_size is None:
+        chunk_size = Config.SURVEY_CHUNK_SIZE
+    if reservoir_size is None:
+        reservoir_size = Config.RESPONSE_RESERVOIR_SIZE
+    _, texts = question_options(question)
+    streams = run_streams(seed)
+    num_chunks = -(-num_respondents // chunk_size)
+    # Every chunk draws from its own substream, so chunks are independent of each
+    # other and of scheduling, and the run replays exactly from (seed, chunk_size)
+    chunk_rngs = chunk_generators(streams[SAMPLE_STREAM], num_chunks)
+
+    # Only one block plus the running tallies and the reservoir are alive at a time
+    tally = np.zeros(len(texts))
+    sum_weights = sum_squared_weights = 0.0
+    crosstabs = CrosstabAccumulator(store, len(texts))
+    reservoir = ResponseReservoir(reservoir_size)
+    for start, rng in zip(range(0, num_respondents, chunk_size), chunk_rngs):
+        block_size = min(chunk_size, num_respondents - start)
+        rows = draw_sample(store, block_size, compiled_config, rng)
+        codes = simulate_responses(store, rows, question, compiled_config, rng)
+        # Each block is raked on its own; caching per-block weights would only churn the cache
+        weights = calculate_weights(store, rows, use_cache=False)
+        tally += weighted_counts(codes, weights, len(texts))
+        sum_weights += weights.sum()
+        sum_squared_weights += np.square(weights).sum()
+        crosstabs.update(rows, codes, weights)
+        reservoir.update(rows, codes, weights, rng)
+    logging.info(f"Streamed {num_respondents} respondents in blocks of {chunk_size}")
+
+    rows, codes, weights = reservoir.items()
+    return {
+        "seed": seed,
+        "aggregate_results": add_margins_of_error(format_weighted_results(tally, question), tally,
+                                                  num_respondents, sum_weights, sum_squared_weights,
+                                                  generator(streams[BOOTSTRAP_STREAM])),
+        "crosstabs": crosstabs.result(texts),
+        "individual_responses": build_individual_responses(store, rows, codes, weights, question),
+        "streaming": {
+            "num_respondents": num_respondents,
+            "chunk_size": chunk_size,
+            "reservoir_size": reservoir_size
+        }
+    }
+
+def conduct_single_question_survey(user_id, session_id, num_respondents=None, seed=None):
     if num_respondents is None:
         num_respondents = Config.NUM_SURVEY_RESPONDENTS
+    seed = new_run_seed() if seed is None else int(seed)
     
     try:
         # Load necessary data
-        profiles_df = load_data()
+        store = get_profile_store()
         latest_question = load_approved_question(user_id, session_id)
         question_config = SurveyData.get_data(session_id, 'question_config', user_id)
         
         if not question_config:
             raise ValueError("No question config found for this user and session")
         
-        # Prepare survey data
-        survey_data = profiles_df.sample(n=num_respondents, replace=True).reset_index(drop=True)
-        
-        # Simulate responses
-        responses = []
-        for _, row in survey_data.iterrows():
-            response = simulate_response(row, latest_question)
-            responses.append({
-                "demographics": row.to_dict(),
-                "response": response,
-                "weight": 1  # need to create and implement calculate_weight function
-            })
+        compiled_config = compile_question_config(question_config, latest_question)
         
-        # Calculate results
-        results = calculate_weighted_results(responses, latest_question)
-        
-        # Prepare the full results dictionary
-        full_results = {
-            "aggregate_results": results,
-            "individual_responses": responses
-        }
+        # Simulate responses and calculate results
+        if num_respondents > Config.STREAMING_THRESHOLD:
+            full_results = stream_survey(store, latest_question, compiled_config, num_respondents, seed)
+        else:
+            full_results = simulate_survey(store, latest_question, compiled_config, num_respondents, seed)
         
         # Save results to database
         SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='survey_results', content=full_results)
-        logging.info(f"Survey results saved to database for user {user_id}, session {session_id}")
+        logging.info(f"Survey results saved to database for user {user_id}, session {session_id}, seed {seed}")
         return full_results
     except Exception as e:
         logging.error(f"Error in conduct_single_question_survey: {str(e)}")
-        raise
\ No newline at end of file
+        raise
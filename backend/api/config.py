@@ -12,6 +12,18 @@ class Config:
         'sqlite:///' + os.path.join(os.path.abspath(os.path.dirname(__file__)), '..', 'app.db')
     SQLALCHEMY_TRACK_MODIFICATIONS = False
     
+    # Managed SQLite: WAL, busy timeout and cache/mmap pragmas on every connection, plus a sized pool,
+    # so several gunicorn workers can share the file without "database is locked" errors
+    SQLITE_MANAGED = os.environ.get('SQLITE_MANAGED', 'true').lower() == 'true'
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 15000))
+    SQLITE_CACHE_SIZE_KB = int(os.environ.get('SQLITE_CACHE_SIZE_KB', 64 * 1024))
+    SQLITE_MMAP_SIZE = int(os.environ.get('SQLITE_MMAP_SIZE', 256 * 1024 * 1024))
+    SQLITE_POOL_SIZE = int(os.environ.get('SQLITE_POOL_SIZE', 20))
+    SQLITE_MAX_OVERFLOW = int(os.environ.get('SQLITE_MAX_OVERFLOW', 20))
+    SQLITE_POOL_TIMEOUT = int(os.environ.get('SQLITE_POOL_TIMEOUT', 30))
+    
     # Define the path to the data directory
     DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data')
 
@@ -25,6 +37,30 @@ class Config:
     # OpenAI configuration
     OPENAI_MODEL = 'gpt-3.5-turbo'
     
+    # Shared OpenAI transport: one pooled, keep-alive HTTP client per process (HTTP/2 when h2 is installed)
+    OPENAI_MAX_CONNECTIONS = int(os.environ.get('OPENAI_MAX_CONNECTIONS', 20))
+    OPENAI_MAX_KEEPALIVE_CONNECTIONS = int(os.environ.get('OPENAI_MAX_KEEPALIVE_CONNECTIONS', 10))
+    OPENAI_KEEPALIVE_EXPIRY = float(os.environ.get('OPENAI_KEEPALIVE_EXPIRY', 60))
+    OPENAI_REQUEST_TIMEOUT = float(os.environ.get('OPENAI_REQUEST_TIMEOUT', 60))
+    OPENAI_CONNECT_TIMEOUT = float(os.environ.get('OPENAI_CONNECT_TIMEOUT', 5))
+    OPENAI_HTTP2 = os.environ.get('OPENAI_HTTP2', 'true').lower() == 'true'
+    
+    # Send each assistant's instructions through chat completions instead of threads/runs,
+    # saving the thread create/poll/list round trips; threads that are used get deleted afterwards
+    OPENAI_USE_CHAT_COMPLETIONS = os.environ.get('OPENAI_USE_CHAT_COMPLETIONS', 'false').lower() == 'true'
+    OPENAI_DELETE_THREADS = os.environ.get('OPENAI_DELETE_THREADS', 'true').lower() == 'true'
+    
+    # LLM backend: 'openai', or 'standin' for the local canned-response server in llm_standin.py
+    LLM_PROVIDER = os.environ.get('LLM_PROVIDER', 'openai')
+    LLM_STANDIN_URL = os.environ.get('LLM_STANDIN_URL', 'http://127.0.0.1:5055/v1')
+    LLM_STANDIN_LATENCY = float(os.environ.get('LLM_STANDIN_LATENCY', 1.0))
+    LLM_STANDIN_JITTER = float(os.environ.get('LLM_STANDIN_JITTER', 0.25))
+    LLM_STANDIN_ERROR_RATE = float(os.environ.get('LLM_STANDIN_ERROR_RATE', 0.0))
+    LLM_STANDIN_SEED = int(os.environ.get('LLM_STANDIN_SEED', 0))
+    
+    # Send prompts as minimal JSON with the static instructions first, so provider-side prefix caching can hit
+    PROMPT_COMPACTION = os.environ.get('PROMPT_COMPACTION', 'false').lower() == 'true'
+    
     # OpenAI Assistant IDs
     ASSISTANTS = {
         "question_transformer": os.environ.get("QUESTION_TRANSFORMER_ID"),
@@ -32,9 +68,87 @@ class Config:
         "survey_analyst": os.environ.get("SURVEY_ANALYST_ID")
     }
     
+    # Assistant runs are polled with exponential backoff and abandoned after the timeout (seconds)
+    ASSISTANT_RUN_TIMEOUT = float(os.environ.get('ASSISTANT_RUN_TIMEOUT', 120))
+    ASSISTANT_POLL_INITIAL_DELAY = float(os.environ.get('ASSISTANT_POLL_INITIAL_DELAY', 0.2))
+    ASSISTANT_POLL_MAX_DELAY = float(os.environ.get('ASSISTANT_POLL_MAX_DELAY', 2.0))
+    ASSISTANT_POLL_BACKOFF = float(os.environ.get('ASSISTANT_POLL_BACKOFF', 1.5))
+    
+    # Persistent cache of question transformations, keyed by normalized question text
+    TRANSFORM_CACHE_MAX_ENTRIES = int(os.environ.get('TRANSFORM_CACHE_MAX_ENTRIES', 5000))
+    TRANSFORM_CACHE_TTL = int(os.environ.get('TRANSFORM_CACHE_TTL', 7 * 24 * 3600))
+    
+    # Batch transformations (/transform-questions, run as a background job): fan-out width, batch size cap
+    # and the shared token-bucket budget for requests per second and tokens per minute (0 disables either limit)
+    TRANSFORM_BATCH_MAX = int(os.environ.get('TRANSFORM_BATCH_MAX', 500))
+    TRANSFORM_BATCH_WORKERS = int(os.environ.get('TRANSFORM_BATCH_WORKERS', 16))
+    TRANSFORM_RATE_LIMIT_RPS = float(os.environ.get('TRANSFORM_RATE_LIMIT_RPS', 5))
+    TRANSFORM_RATE_LIMIT_TPM = float(os.environ.get('TRANSFORM_RATE_LIMIT_TPM', 90000))
+    TRANSFORM_COMPLETION_TOKENS = int(os.environ.get('TRANSFORM_COMPLETION_TOKENS', 150))
+    
+    # Generated question_configs, keyed by a fingerprint of the transformed question and options
+    CONFIG_CACHE_MAX_ENTRIES = int(os.environ.get('CONFIG_CACHE_MAX_ENTRIES', 5000))
+    CONFIG_CACHE_TTL = int(os.environ.get('CONFIG_CACHE_TTL', 30 * 24 * 3600))
+    # Sent as X-Admin-Token to clear every cached config over HTTP; unset disables that (use `flask clear-config-cache`)
+    CONFIG_CACHE_ADMIN_TOKEN = os.environ.get('CONFIG_CACHE_ADMIN_TOKEN')
+    
+    # Generate the question_config in the background as soon as a question is transformed
+    SPECULATIVE_CONFIG = os.environ.get('SPECULATIVE_CONFIG', 'true').lower() == 'true'
+    SPECULATION_WORKERS = int(os.environ.get('SPECULATION_WORKERS', 4))
+    SPECULATION_MAX_PENDING = int(os.environ.get('SPECULATION_MAX_PENDING', 256))
+    
+    # Background jobs for /approve-question and /transform-questions, run by a local thread pool and persisted in the database
+    JOB_WORKERS = int(os.environ.get('JOB_WORKERS', 4))
+    JOB_STALE_AFTER = int(os.environ.get('JOB_STALE_AFTER', 600))
+    # Clients poll GET /jobs/<id> by default. JOB_EVENTS_SSE also offers a server-sent event stream, which holds
+    # a worker for the whole job: only enable it with threaded or async workers (e.g. gunicorn --threads or gevent)
+    JOB_EVENTS_SSE = os.environ.get('JOB_EVENTS_SSE', 'false').lower() == 'true'
+    JOB_EVENTS_POLL_INTERVAL = float(os.environ.get('JOB_EVENTS_POLL_INTERVAL', 0.5))
+    JOB_EVENTS_TIMEOUT = int(os.environ.get('JOB_EVENTS_TIMEOUT', 300))
+    
+    # Stream the analysis into the job's progress events, one field or interpretation entry at a time
+    STREAM_ANALYSIS = os.environ.get('STREAM_ANALYSIS', 'true').lower() == 'true'
+    
+    # Collect the SurveyData writes of each approval run and commit them once, as a bulk insert
+    SURVEY_DATA_UNIT_OF_WORK = os.environ.get('SURVEY_DATA_UNIT_OF_WORK', 'true').lower() == 'true'
+    
+    # Decoded SurveyData reads: a per-request identity map, plus an opt-in process-wide LRU. Writes only
+    # refresh the LRU in their own process, so with several workers its TTL bounds how long another
+    # worker's write can go unseen; enable it (e.g. 1024) only for a single worker process
+    SURVEY_DATA_CACHE_SIZE = int(os.environ.get('SURVEY_DATA_CACHE_SIZE', 0))
+    SURVEY_DATA_CACHE_TTL = int(os.environ.get('SURVEY_DATA_CACHE_TTL', 300))
+    
+    # Stored SurveyData encoding: msgspec 'msgpack' or 'json', zlib-compressed from this many bytes up (0 disables)
+    SURVEY_DATA_CODEC = os.environ.get('SURVEY_DATA_CODEC', 'msgpack')
+    SURVEY_DATA_COMPRESS_THRESHOLD = int(os.environ.get('SURVEY_DATA_COMPRESS_THRESHOLD', 4096))
+    SURVEY_DATA_COMPRESS_LEVEL = int(os.environ.get('SURVEY_DATA_COMPRESS_LEVEL', 3))
+    
     # Survey configuration
     NUM_SURVEY_RESPONDENTS = int(os.environ.get('NUM_SURVEY_RESPONDENTS', 100))
     
+    # Surveys larger than STREAMING_THRESHOLD are simulated in fixed-size chunks with flat
+    # memory, keeping only a reservoir sample of individual responses (0 keeps none)
+    STREAMING_THRESHOLD = int(os.environ.get('STREAMING_THRESHOLD', 50000))
+    SURVEY_CHUNK_SIZE = int(os.environ.get('SURVEY_CHUNK_SIZE', 20000))
+    RESPONSE_RESERVOIR_SIZE = int(os.environ.get('RESPONSE_RESERVOIR_SIZE', 1000))
+    
+    # Respondent sampling: 'random' draws uniformly from all profiles, 'quota' draws
+    # exact per-stratum quotas from QUOTA_SOURCE ('question_config' or 'census')
+    SAMPLING_MODE = os.environ.get('SAMPLING_MODE', 'random')
+    QUOTA_SOURCE = os.environ.get('QUOTA_SOURCE', 'question_config')
+    QUOTA_VARIABLES = os.environ.get('QUOTA_VARIABLES', 'Gender,Age,Race,Education,GeographicRegion').split(',')
+    STRATA_INDEX_CACHE_SIZE = int(os.environ.get('STRATA_INDEX_CACHE_SIZE', 8))
+    
+    # Raking (iterative proportional fitting) against census marginals
+    RAKING_VARIABLES = os.environ.get('RAKING_VARIABLES', 'Gender,Age,Race,Education,GeographicRegion').split(',')
+    RAKING_TOLERANCE = float(os.environ.get('RAKING_TOLERANCE', 1e-4))
+    RAKING_MAX_ITERATIONS = int(os.environ.get('RAKING_MAX_ITERATIONS', 50))
+    WEIGHT_CACHE_SIZE = int(os.environ.get('WEIGHT_CACHE_SIZE', 256))
+    
+    # Margins of error from multinomial replicates
+    BOOTSTRAP_REPLICATES = int(os.environ.get('BOOTSTRAP_REPLICATES', 2000))
+    CONFIDENCE_LEVEL = float(os.environ.get('CONFIDENCE_LEVEL', 0.95))
+    
     # Other configuration parameters
     MAX_RETRIES = int(os.environ.get('MAX_RETRIES', 3))
     
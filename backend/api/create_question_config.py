@@ -1,19 +1,19 @@
 import json
 import re
-import time
-import openai
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from .config import Config
 from .models import SurveyData
-from . import db
+from .llm_providers import complete
+from .cache import PersistentCache, fingerprint, normalize_text
+from .prompt_compaction import compact_json, compact_text
+from .profile_store import get_profile_store
 
 # Load environment variables
 load_dotenv()
 
-# Set up OpenAI client
-client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-ASSISTANT_ID = Config.ASSISTANTS["question_config_generator"]
-
 DEMOGRAPHIC_VARIABLES = {
     "Gender": ["Male", "Female"],
     "Race": ["White", "Black", "Hispanic", "Asian", "Other", "Mixed Race"],
@@ -34,6 +34,29 @@ DEMOGRAPHIC_VARIABLES = {
     "HealthInsurance": ["Insured", "Uninsured"]
 }
 
+# Cached configs are keyed on this, so changing the categories retires every old entry
+SCHEMA_VERSION = fingerprint(DEMOGRAPHIC_VARIABLES)[:12]
+
+# Everything that does not depend on the question, built once and sent first in compact mode
+QUESTION_CONFIG_INSTRUCTIONS = compact_text(f"""
+    As Nate Bronze, the Chief Data Scientist, generate a question_config.json file for the survey question given at the end.
+    1. Assign four relevant demographic variables from the categories below.
+    2. For each demographic variable, provide categories and their weights (proportions) summing to 1.0, using only these categories:
+    {compact_json(DEMOGRAPHIC_VARIABLES)}
+    3. For each category, estimate how people in that category would answer: a probability for every answer option, keyed by the option keys given at the end, summing to 1.0.
+    Format, with exactly four variables:
+    {{"DemographicVariable":{{"Category":{{"weight":weight,"responses":{{"OptionKey":probability,...}}}},...}},...}}
+    The weights and response probabilities should reflect realistic distributions based on your expertise.
+    IMPORTANT: Respond ONLY with the JSON content. Do not include any explanations or additional text before or after the JSON.
+    """)
+
+config_cache = PersistentCache('question_config', Config.CONFIG_CACHE_MAX_ENTRIES, Config.CONFIG_CACHE_TTL)
+
+# Speculative generations in flight, keyed by (user_id, session_id) -> (question fingerprint, future)
+_speculation_executor = ThreadPoolExecutor(max_workers=Config.SPECULATION_WORKERS, thread_name_prefix='speculative-config')
+_speculations = OrderedDict()
+_speculations_lock = threading.Lock()
+
 def read_approved_question(user_id, session_id):
     try:
         question_data = SurveyData.get_data(session_id, 'transformed_question', user_id)
@@ -42,75 +65,60 @@ def read_approved_question(user_id, session_id):
         print(f"Error reading latest question: {str(e)}")
         return ""
 
-def generate_question_config(question):
-    prompt = f"""
+def build_question_config_prompt(question, compact=False):
+    options = question.get('options', {}) if isinstance(question, dict) else {}
+    option_keys = list(options.keys()) if isinstance(options, dict) else list(options)
+    if compact:
+        return f"{QUESTION_CONFIG_INSTRUCTIONS}\nOption keys: {compact_json(option_keys)}\nSurvey question: {compact_json(question)}"
+    return f"""
     As Nate Bronze, the Chief Data Scientist, generate a question_config.json file based on the following survey question. For this question:
     1. Assign four relevant demographic variables from the following list:
     {', '.join(DEMOGRAPHIC_VARIABLES.keys())}
     2. For each demographic variable, provide appropriate categories and their corresponding weights (proportions) that sum to 1.0. Use only the following categories for each variable:
     {json.dumps(DEMOGRAPHIC_VARIABLES, indent=2)}
+    3. For each category, estimate how people in that category would answer the question: give a probability for every answer option, keyed by the option keys {json.dumps(option_keys)}, summing to 1.0.
     Use the following format for the JSON structure:
     {{
     "DemographicVariable1": {{
-        "Category1": weight,
-        "Category2": weight,
+        "Category1": {{"weight": weight, "responses": {{"OptionKey1": probability, "OptionKey2": probability, ...}}}},
+        "Category2": {{"weight": weight, "responses": {{"OptionKey1": probability, "OptionKey2": probability, ...}}}},
         ...
     }},
     "DemographicVariable2": {{
-        "Category1": weight,
-        "Category2": weight,
         ...
     }},
     "DemographicVariable3": {{
-        "Category1": weight,
-        "Category2": weight,
         ...
     }},
     "DemographicVariable4": {{
-        "Category1": weight,
-        "Category2": weight,
         ...
     }}
     }}
-    Ensure that you only use the demographic variables and categories from the provided list. The weights should reflect realistic distributions based on your expertise.
+    Ensure that you only use the demographic variables and categories from the provided list. The weights and response probabilities should reflect realistic distributions based on your expertise.
     Survey question:
     {question}
     IMPORTANT: Respond ONLY with the JSON content. Do not include any explanations or additional text before or after the JSON.
     """
-    # Create a thread
-    thread = client.beta.threads.create()
-    # Add a message to the thread
-    message = client.beta.threads.messages.create(
-        thread_id=thread.id,
-        role="user",
-        content=prompt
-    )
-    # Run the assistant
-    run = client.beta.threads.runs.create(
-        thread_id=thread.id,
-        assistant_id=ASSISTANT_ID
-    )
-    # Wait for the run to complete
-    while run.status != "completed":
-        run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-        time.sleep(1)
-    # Retrieve the messages
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
-    # Get the last message from the assistant
-    last_message = messages.data[0]
-    return last_message.content[0].text.value
+
+def generate_question_config(question):
+    prompt = build_question_config_prompt(question, Config.PROMPT_COMPACTION)
+    baseline_prompt = build_question_config_prompt(question) if Config.PROMPT_COMPACTION else None
+    return complete("question_config_generator", prompt, baseline_prompt=baseline_prompt)
+
+def extract_question_config(config_data):
+    json_match = re.search(r'```json\s*([\s\S]*?)\s*```', config_data)
+    if json_match:
+        json_str = json_match.group(1)
+    else:
+        json_str = config_data
+    return json.loads(json_str)
 
 def save_question_config(user_id, session_id, config_data):
     try:
-        json_match = re.search(r'```json\s*([\s\S]*?)\s*```', config_data)
-        if json_match:
-            json_str = json_match.group(1)
-        else:
-            json_str = config_data
-        json_data = json.loads(json_str)
+        json_data = extract_question_config(config_data) if isinstance(config_data, str) else config_data
         SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='question_config', content=json_data)
         print(f"Successfully saved question config for user {user_id}, session {session_id}")
-        return True
+        return json_data
     except json.JSONDecodeError as e:
         print(f"Error: Invalid JSON response. Details: {str(e)}")
         print("Full API Response:")
@@ -120,16 +128,121 @@ def save_question_config(user_id, session_id, config_data):
         print(f"Unexpected error while saving question config: {str(e)}")
         return False
 
+def question_fingerprint(question):
+    # Stable across sessions: normalized question text and options plus the demographic schema version
+    options = question.get('options', {}) if isinstance(question, dict) else {}
+    if isinstance(options, dict):
+        options = {str(k): normalize_text(v) for k, v in options.items()}
+    else:
+        options = [normalize_text(o) for o in options]
+    return fingerprint({
+        'schema': SCHEMA_VERSION,
+        'question': normalize_text(question.get('question', '') if isinstance(question, dict) else question),
+        'options': options
+    })
+
+def invalidate_cached_config(question=None):
+    # Drops the cached config for one question, or every cached config
+    key = question_fingerprint(question) if question is not None else None
+    removed = config_cache.invalidate(key)
+    print(f"Invalidated {removed} cached question config(s)")
+    return removed
+
+def question_config_problems(config):
+    # Reasons a generated config cannot be used; empty when every variable and category is known to the profiles
+    if not isinstance(config, dict) or not config:
+        return [f"expected a non-empty object, got {type(config).__name__}"]
+    store = get_profile_store()
+    problems = []
+    for variable, categories in config.items():
+        if variable not in DEMOGRAPHIC_VARIABLES or variable not in store.categories:
+            problems.append(f"unknown demographic variable {variable!r}")
+            continue
+        if not isinstance(categories, dict) or not categories:
+            problems.append(f"{variable} should map categories to weights")
+            continue
+        known = DEMOGRAPHIC_VARIABLES[variable]
+        present = {known[code] for code in set(store.encode(variable, known).tolist()) if code >= 0}
+        for category, value in categories.items():
+            if category not in present:
+                problems.append(f"unknown category {category!r} for {variable}")
+            elif not isinstance(value, (dict, int, float)) or isinstance(value, bool):
+                problems.append(f"{variable}/{category} should be a weight or an object with a weight")
+    return problems
+
+def resolve_question_config(question):
+    # Cached config for the question or a freshly generated one; None when the response is not a usable config
+    key = question_fingerprint(question)
+    cached_config = config_cache.get(key)
+    if cached_config is not None:
+        if not question_config_problems(cached_config):
+            print("Question config served from cache")
+            return cached_config
+        config_cache.invalidate(key)
+    config_data = generate_question_config(question)
+    try:
+        json_data = extract_question_config(config_data)
+    except json.JSONDecodeError as e:
+        print(f"Error: Invalid JSON response. Details: {str(e)}")
+        print("Full API Response:")
+        print(config_data)
+        return None
+    problems = question_config_problems(json_data)
+    if problems:
+        # Not cached, so the next request for this question generates a fresh config
+        print(f"Error: Invalid question config, not caching it: {'; '.join(problems)}")
+        return None
+    config_cache.set(key, json_data)
+    return json_data
+
+def start_speculative_config(app, user_id, session_id, question):
+    # Starts generating the config as soon as a question is transformed, so approval does not wait for it
+    if not Config.SPECULATIVE_CONFIG:
+        return
+    key = question_fingerprint(question)
+
+    def generate():
+        with app.app_context():
+            return resolve_question_config(question)
+
+    with _speculations_lock:
+        current = _speculations.get((user_id, session_id))
+        if current is not None and current[0] == key:
+            return
+        _speculations[(user_id, session_id)] = (key, _speculation_executor.submit(generate))
+        _speculations.move_to_end((user_id, session_id))
+        while len(_speculations) > Config.SPECULATION_MAX_PENDING:
+            _speculations.popitem(last=False)
+    print(f"Started speculative question config for user {user_id}, session {session_id}")
+
+def take_speculative_config(user_id, session_id, question, timeout=None):
+    with _speculations_lock:
+        speculation = _speculations.pop((user_id, session_id), None)
+    # A speculation for a question the user since rejected is simply dropped
+    if speculation is None or speculation[0] != question_fingerprint(question):
+        return None
+    try:
+        return speculation[1].result(timeout=timeout)
+    except Exception as e:
+        print(f"Speculative question config failed: {str(e)}")
+        return None
+
 def main(user_id, session_id):
     try:
         latest_question = read_approved_question(user_id, session_id)
         if not latest_question:
             raise ValueError("No question found for this user and session")
-        question_config = generate_question_config(latest_question)
-        if save_question_config(user_id, session_id, question_config):
+        json_data = take_speculative_config(user_id, session_id, latest_question, Config.ASSISTANT_RUN_TIMEOUT)
+        if json_data is not None:
+            print("Question config taken from speculative generation")
+        else:
+            json_data = resolve_question_config(latest_question)
+        if json_data is not None and save_question_config(user_id, session_id, json_data) is not False:
             print("Question config generated and saved successfully")
+            return json_data
     except Exception as e:
         print(f"An unexpected error occurred: {str(e)}")
+    return None
 
 if __name__ == "__main__":
     import sys
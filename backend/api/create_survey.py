@@ -1,24 +1,43 @@
-import os
-import openai
 from dotenv import load_dotenv
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from .config import Config
 from .models import SurveyData
+from .llm_providers import complete
+from .prompt_compaction import compact_json, compact_text
+from .rate_limit import RateLimiter
+from .llm_metrics import estimate_tokens
+from .cache import PersistentCache, fingerprint, normalize_text
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 load_dotenv()
 
-client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
 
-ASSISTANT_ID = Config.ASSISTANTS["question_transformer"]
+transform_cache = PersistentCache('question_transform', Config.TRANSFORM_CACHE_MAX_ENTRIES, Config.TRANSFORM_CACHE_TTL)
 
-def transform_question(user_question):
-    logger.info(f"Transforming question: {user_question}")
+# Shared by every batch so concurrent batches stay within the provider's limits together
+transform_limiter = RateLimiter(Config.TRANSFORM_RATE_LIMIT_RPS, Config.TRANSFORM_RATE_LIMIT_TPM)
+_batch_executor = ThreadPoolExecutor(max_workers=Config.TRANSFORM_BATCH_WORKERS, thread_name_prefix='transform-batch')
 
-    prompt = f""" 
+# Static instructions first and the user input last, so the shared prefix can be cached provider-side
+TRANSFORM_INSTRUCTIONS = compact_text("""
+    Transform this user input into a high-quality polling question.
+    Requirements:
+    1. Clarify the intent and use neutral, objective language.
+    2. Frame for a broad audience and be specific.
+    3. Classify the question type (e.g., Likert scale, multiple choice, yes/no).
+    4. Provide 3-5 answer options keyed "a", "b", "c", ...
+    5. If the question type doesn't suit multiple options, provide appropriate fallback options.
+    Respond only with a JSON object, without any code block formatting or extra text. The keys in the JSON should be "question", "type", and "options".
+    """)
+
+def build_transform_prompt(user_question, compact=False):
+    if compact:
+        return f"{TRANSFORM_INSTRUCTIONS}\nUser input: {compact_json(user_question)}"
+    return f""" 
     Transform this user input into a high-quality polling question:
     "{user_question}"
 
@@ -35,24 +54,15 @@ def transform_question(user_question):
     Respond only with a JSON object, without any code block formatting or extra text. The keys in the JSON should be "question", "type", and "options".
     """
 
+def transform_question(user_question):
+    logger.info(f"Transforming question: {user_question}")
+
+    prompt = build_transform_prompt(user_question, Config.PROMPT_COMPACTION)
+    baseline_prompt = build_transform_prompt(user_question) if Config.PROMPT_COMPACTION else None
+
     try:
-        thread = client.beta.threads.create()
-        client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=prompt
-        )
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=ASSISTANT_ID
-        )
-        while run.status != "completed":
-            run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
-        logger.info(f"Raw messages response: {messages}")
-        if not messages.data or not messages.data[0].content or not messages.data[0].content[0].text.value:
-            raise ValueError("Invalid response received from API")
-        response = messages.data[0].content[0].text.value
+        response = complete("question_transformer", prompt, baseline_prompt=baseline_prompt)
+        logger.info(f"Raw assistant response: {response}")
         transformed = json.loads(response)
         logger.info(f"Transformed question: {transformed}")
         return transformed
@@ -60,6 +70,59 @@ def transform_question(user_question):
         logger.error(f"Error in OpenAI API call: {str(e)}")
         raise
 
+def transform_question_cached(user_question):
+    key = fingerprint(normalize_text(user_question))
+    transformed = transform_cache.get(key)
+    if transformed is not None:
+        logger.info(f"Transformation cache hit for question: {user_question}")
+        return transformed
+    transformed = transform_question(user_question)
+    transform_cache.set(key, transformed)
+    return transformed
+
+def transform_question_limited(user_question):
+    # Budget is the estimated prompt plus a typical answer
+    tokens = estimate_tokens(build_transform_prompt(user_question, Config.PROMPT_COMPACTION)) + Config.TRANSFORM_COMPLETION_TOKENS
+    transform_limiter.acquire(tokens, timeout=Config.ASSISTANT_RUN_TIMEOUT)
+    transformed = transform_question(user_question)
+    transform_cache.set(fingerprint(normalize_text(user_question)), transformed)
+    return transformed
+
+def transform_questions(app, questions):
+    """Transform a batch of questions, yielding one result dict per question as each finishes.
+
+    Cache hits are yielded first and never touch the rate limiter. Misses fan out
+    over the shared batch executor, one call per distinct question, and a failure
+    only marks the items it belongs to.
+    """
+    pending = {}
+    for index, question in enumerate(questions):
+        if not isinstance(question, str) or not question.strip():
+            yield {"index": index, "original_question": question, "error": "Question must be a non-empty string"}
+            continue
+        key = fingerprint(normalize_text(question))
+        cached = transform_cache.get(key)
+        if cached is not None:
+            yield {"index": index, "original_question": question, "transformed_question": cached, "cached": True}
+        else:
+            pending.setdefault(key, []).append((index, question))
+
+    def run(question):
+        with app.app_context():
+            return transform_question_limited(question)
+
+    futures = {_batch_executor.submit(run, items[0][1]): items for items in pending.values()}
+    for future in as_completed(futures):
+        try:
+            transformed = future.result()
+        except Exception as e:
+            logger.error(f"Batch transformation failed for {futures[future][0][1]}: {str(e)}")
+            for index, question in futures[future]:
+                yield {"index": index, "original_question": question, "error": str(e)}
+            continue
+        for index, question in futures[future]:
+            yield {"index": index, "original_question": question, "transformed_question": transformed, "cached": False}
+
 def save_transformed_question(user_id, session_id, transformed_question):
     try:
         SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='transformed_question', content=transformed_question)
@@ -70,7 +133,7 @@ def save_transformed_question(user_id, session_id, transformed_question):
 
 def process_and_save_question(user_id, session_id, user_question):
     try:
-        transformed_question = transform_question(user_question)
+        transformed_question = transform_question_cached(user_question)
         save_transformed_question(user_id, session_id, transformed_question)
         SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='original_question', content=user_question)
         logger.info(f"Original question saved to database for user {user_id}, session {session_id}")
@@ -1,10 +1,13 @@
 import json
-import time
 import logging
-import openai
 from dotenv import load_dotenv
 from .config import Config
 from .models import SurveyData
+from .llm_providers import complete, stream
+from .streaming_json import IncrementalJSONParser
+from .packed_responses import response_count
+from .crosstabs import strongest_breakdowns
+from .prompt_compaction import compact_json, compact_text, round_floats
 import re
 
 # Set up logging
@@ -13,10 +16,6 @@ logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(
 # Load environment variable
 load_dotenv()
 
-# Set up OpenAI client
-client = openai.OpenAI(api_key=Config.OPENAI_API_KEY)
-ASSISTANT_ID = Config.ASSISTANTS["survey_analyst"]
-
 def load_survey_data(user_id, session_id):
     try:
         question_data = SurveyData.get_data(session_id, 'transformed_question', user_id)
@@ -27,17 +26,37 @@ def load_survey_data(user_id, session_id):
                      "Individual responses: %d",
                      question_data['question'],
                      len(results["aggregate_results"]['answers']),
-                     len(results['individual_responses']))
+                     response_count(results['individual_responses']))
         return {
             'question': question_data,
             'aggregate_results': results['aggregate_results'],
+            'crosstabs': results.get('crosstabs'),
             'individual_responses': results['individual_responses']
         }
     except Exception as e:
         logging.error(f"Unexpected error loading survey data: {str(e)}")
         raise
 
-def format_analysis_prompt(survey_data):
+# Static instructions first, then the survey data, so the shared prefix can be cached provider-side
+ANALYSIS_INSTRUCTIONS = compact_text("""
+    Analyze the following survey data and provide a brief, engaging summary as a single, complete JSON object in one message, 800 words maximum, with no text before or after it:
+    {"key_finding":"A punchy, exciting insight with a percentage in fewer than 7 words.","quick_stats":["First interesting statistic from the results.","Second ...","Third ..."],"interpretation":[{"name":"Name","age":"Age","description":"Brief phrase describing who they are and where they're from","quote":"First-person quote reflecting their perspective on the survey topic"}, five such entries],"fun_fact":"An interesting or surprising takeaway from the focus group leader."}
+    Guidelines:
+    1. Key Finding: Identify the most surprising insight, including a percentage.
+    2. Quick Stats: Summarize three engaging statistics as if sharing exciting focus group moments. Base any demographic comparison on the Demographic Breakdown; do not invent group differences.
+    3. Interpretation: Create five diverse testimonials from imaginary focus group participants.
+    4. Fun Fact: Provide a reflection from the perspective of the focus group leader.
+    If data is unavailable, use placeholders to maintain the JSON structure.
+    """)
+
+def format_analysis_prompt(survey_data, compact=False):
+    crosstabs = survey_data.get('crosstabs')
+    breakdown = strongest_breakdowns(crosstabs, survey_data['aggregate_results']) if crosstabs else "Not available"
+    if compact:
+        return (f"{ANALYSIS_INSTRUCTIONS}\n"
+                f"Survey Question: {survey_data['question']['question']}\n"
+                f"Aggregate Results: {compact_json(round_floats(survey_data['aggregate_results']))}\n"
+                f"Demographic Breakdown (weighted answer percentages by group, largest differences first): {compact_json(breakdown)}")
     prompt = f"""
     IMPORTANT: Your entire response must be a single, complete JSON object provided in one message. Do not split your response across multiple messages. Limit your response to 800 words maximum.
 
@@ -65,10 +84,12 @@ def format_analysis_prompt(survey_data):
     Survey Question: {survey_data['question']['question']}
     Aggregate Results:
     {json.dumps(survey_data['aggregate_results'], indent=2)}
+    Demographic Breakdown (weighted answer percentages by group, largest differences first):
+    {json.dumps(breakdown, indent=2)}
 
     Guidelines:
     1. Key Finding: Identify the most surprising insight, including a percentage.
-    2. Quick Stats: Summarize three engaging statistics as if sharing exciting focus group moments.
+    2. Quick Stats: Summarize three engaging statistics as if sharing exciting focus group moments. Base any demographic comparison on the Demographic Breakdown; do not invent group differences.
     3. Interpretation: Create five diverse testimonials from imaginary focus group participants.
     4. Fun Fact: Provide a reflection from the perspective of the focus group leader.
 
@@ -77,30 +98,34 @@ def format_analysis_prompt(survey_data):
     logging.info("Analysis prompt formatted successfully.")
     return prompt
 
-def get_analysis_from_assistant(prompt):
+def get_analysis_from_assistant(prompt, baseline_prompt=None):
     try:
-        thread = client.beta.threads.create()
-        message = client.beta.threads.messages.create(
-            thread_id=thread.id,
-            role="user",
-            content=prompt
-        )
-        run = client.beta.threads.runs.create(
-            thread_id=thread.id,
-            assistant_id=ASSISTANT_ID
-        )
-        while run.status != "completed":
-            run = client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)
-            time.sleep(1)
-        messages = client.beta.threads.messages.list(thread_id=thread.id)
-        last_message = messages.data[0]
-        response = last_message.content[0].text.value
+        response = complete("survey_analyst", prompt, baseline_prompt=baseline_prompt)
         logging.info("Analysis received from assistant. Response: %s", response)  # Log the raw response
         return response
     except Exception as e:
         logging.error(f"Error getting analysis from assistant: {str(e)}")
         raise
 
+def stream_analysis_from_assistant(prompt, on_event, baseline_prompt=None):
+    # Forwards each analysis field, and each interpretation entry, as soon as it has streamed in full
+    parser = IncrementalJSONParser(item_keys=('interpretation',))
+    parts = []
+    try:
+        for delta in stream("survey_analyst", prompt, baseline_prompt=baseline_prompt):
+            parts.append(delta)
+            for event in parser.feed(delta):
+                if event[0] == 'item':
+                    on_event('analysis_item', field=event[1], index=event[2], value=event[3])
+                elif event[1] in ('key_finding', 'quick_stats', 'fun_fact'):
+                    on_event('analysis_field', field=event[1], value=event[2])
+        response = ''.join(parts)
+        logging.info("Streamed analysis received from assistant. Response: %s", response)
+        return response
+    except Exception as e:
+        logging.error(f"Error streaming analysis from assistant: {str(e)}")
+        raise
+
 def preprocess_json(json_string):
     # Remove any leading/trailing whitespace
     json_string = json_string.strip()
@@ -160,11 +185,15 @@ def create_default_analysis():
         'fun_fact': "Did you know? Surveys can sometimes be unpredictable!"
     }
 
-def main(user_id, session_id):
+def main(user_id, session_id, on_event=None):
     try:
         survey_data = load_survey_data(user_id, session_id)
-        analysis_prompt = format_analysis_prompt(survey_data)
-        ai_response = get_analysis_from_assistant(analysis_prompt)
+        analysis_prompt = format_analysis_prompt(survey_data, Config.PROMPT_COMPACTION)
+        baseline_prompt = format_analysis_prompt(survey_data) if Config.PROMPT_COMPACTION else None
+        if on_event is not None and Config.STREAM_ANALYSIS:
+            ai_response = stream_analysis_from_assistant(analysis_prompt, on_event, baseline_prompt)
+        else:
+            ai_response = get_analysis_from_assistant(analysis_prompt, baseline_prompt)
         analysis_data = parse_ai_response(ai_response)
         
         # Always save analysis to database, even if it's the default analysis
@@ -0,0 +1,76 @@
+import logging
+from typing import Any, Dict, List, Optional, Sequence
+import numpy as np
+from .create_question_config import DEMOGRAPHIC_VARIABLES
+from .profile_store import ProfileStore
+
+logger = logging.getLogger(__name__)
+
+
+class CrosstabAccumulator:
+    """Weighted answer distributions by every demographic variable.
+
+    All (variable, category, answer) cells share one flat array, laid out
+    variable by variable, so each update is a single grouped bincount no
+    matter how many variables are broken down. Blocks can be added one at a
+    time, which is how the streaming survey mode feeds it.
+    """
+
+    def __init__(self, store: ProfileStore, num_options: int, variables: Optional[Sequence[str]] = None):
+        self.store = store
+        self.num_options = num_options
+        self.variables = [v for v in (variables or DEMOGRAPHIC_VARIABLES) if v in store.categories]
+        sizes = [len(DEMOGRAPHIC_VARIABLES[v]) * num_options for v in self.variables]
+        self.offsets = np.concatenate(([0], np.cumsum(sizes))).astype(np.int64)
+        self.weighted = np.zeros(self.offsets[-1])
+        self.counts = np.zeros(self.offsets[-1], dtype=np.int64)
+
+    def update(self, rows: np.ndarray, codes: np.ndarray, weights: np.ndarray):
+        codes = np.asarray(codes, dtype=np.int64)
+        cells, cell_weights = [], []
+        for variable, offset in zip(self.variables, self.offsets[:-1]):
+            categories = self.store.encode(variable, DEMOGRAPHIC_VARIABLES[variable])[rows]
+            matched = categories >= 0
+            cells.append(offset + categories[matched] * self.num_options + codes[matched])
+            cell_weights.append(weights[matched])
+        if not cells:
+            return
+        cells = np.concatenate(cells)
+        self.weighted += np.bincount(cells, weights=np.concatenate(cell_weights), minlength=len(self.weighted))
+        self.counts += np.bincount(cells, minlength=len(self.counts))
+
+    def result(self, options: List[str]) -> Dict[str, Any]:
+        breakdown = {}
+        for variable, start, end in zip(self.variables, self.offsets[:-1], self.offsets[1:]):
+            weighted = self.weighted[start:end].reshape(-1, self.num_options)
+            counts = self.counts[start:end].reshape(-1, self.num_options).sum(axis=1)
+            totals = weighted.sum(axis=1)
+            percentages = np.divide(weighted * 100, totals[:, None], out=np.zeros_like(weighted), where=totals[:, None] > 0)
+            breakdown[variable] = {
+                category: {
+                    'n': int(n),
+                    'percentages': {option: round(float(p), 1) for option, p in zip(options, row)}
+                }
+                for category, n, row in zip(DEMOGRAPHIC_VARIABLES[variable], counts, percentages)
+                if n > 0
+            }
+        return breakdown
+
+
+def weighted_crosstabs(store: ProfileStore, rows: np.ndarray, codes: np.ndarray, weights: np.ndarray,
+                       options: List[str]) -> Dict[str, Any]:
+    accumulator = CrosstabAccumulator(store, len(options))
+    accumulator.update(rows, codes, weights)
+    return accumulator.result(options)
+
+
+def strongest_breakdowns(crosstabs: Dict[str, Any], aggregate_results: Dict[str, Any], limit: int = 5) -> Dict[str, Any]:
+    # Variables whose groups deviate most from the topline, for the analysis prompt
+    topline = {a['text']: a['percentage'] for a in aggregate_results.get('answers', [])}
+
+    def spread(groups):
+        return max((abs(p - topline.get(option, 0.0))
+                    for group in groups.values() for option, p in group['percentages'].items()), default=0.0)
+
+    ranked = sorted(crosstabs.items(), key=lambda item: spread(item[1]), reverse=True)
+    return dict(ranked[:limit])
@@ -0,0 +1,72 @@
+import json
+import uuid
+import logging
+from datetime import datetime, timedelta
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy import update
+from . import db
+from .config import Config
+from .models import Job, JobEvent
+
+logger = logging.getLogger('voxbox')
+
+QUEUED, RUNNING, SUCCEEDED, FAILED = 'queued', 'running', 'succeeded', 'failed'
+FINISHED_STATUSES = {SUCCEEDED, FAILED}
+
+_executor = ThreadPoolExecutor(max_workers=Config.JOB_WORKERS, thread_name_prefix='job')
+
+
+def _update(job_id, **fields):
+    job = db.session.get(Job, job_id)
+    for name, value in fields.items():
+        setattr(job, name, value)
+    job.updated_at = datetime.utcnow()
+    db.session.commit()
+    return job
+
+
+def _run(app, job_id, func):
+    with app.app_context():
+        try:
+            _update(job_id, status=RUNNING)
+
+            def report(event, **data):
+                # Each event is its own row, so stages reporting from other threads only ever insert;
+                # touching updated_at keeps a job that is still reporting from being marked stale
+                now = datetime.utcnow()
+                db.session.add(JobEvent(job_id=job_id, event=event, data=json.dumps(data), created_at=now))
+                db.session.execute(update(Job).where(Job.id == job_id).values(updated_at=now))
+                db.session.commit()
+
+            result = func(report)
+            _update(job_id, status=SUCCEEDED, result=json.dumps(result))
+            logger.info(f"Job {job_id} succeeded")
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Job {job_id} failed: {str(e)}", exc_info=True)
+            _update(job_id, status=FAILED, error=str(e))
+
+
+def enqueue_job(app, user_id, session_id, kind, func):
+    """Persist a queued job and hand ``func(report)`` to the local worker pool.
+
+    ``func`` runs inside an app context on a worker thread; it reports progress
+    through ``report(event, **data)`` and its return value becomes the job result.
+    """
+    job = Job(id=str(uuid.uuid4()), user_id=user_id, session_id=session_id, kind=kind, status=QUEUED, progress='[]')
+    db.session.add(job)
+    db.session.commit()
+    _executor.submit(_run, app, job.id, func)
+    logger.info(f"Job {job.id} ({kind}) queued for user {user_id}, session {session_id}")
+    return job.id
+
+
+def get_job(job_id, user_id=None):
+    db.session.rollback()  # start a fresh read so updates from the worker thread are visible
+    job = db.session.get(Job, job_id, populate_existing=True)
+    if job is None or (user_id is not None and job.user_id != user_id):
+        return None
+    # A job whose worker died (restart, crash) would otherwise stay pending forever
+    if job.status not in FINISHED_STATUSES and job.updated_at < datetime.utcnow() - timedelta(seconds=Config.JOB_STALE_AFTER):
+        job = _update(job.id, status=FAILED, error="Job was abandoned by its worker")
+    return job
@@ -0,0 +1,105 @@
+import threading
+from collections import deque
+import numpy as np
+
+# Latency percentiles are taken over the most recent calls of each stage
+LATENCY_WINDOW = 1000
+
+
+def estimate_tokens(text):
+    # Rough count (about four characters per token) for when the API reports no usage
+    return max(1, len(text or '') // 4)
+
+
+def _usage_value(usage, name):
+    if usage is None:
+        return None
+    return usage.get(name) if isinstance(usage, dict) else getattr(usage, name, None)
+
+
+def _cached_tokens(usage):
+    details = _usage_value(usage, 'prompt_tokens_details')
+    if details is None:
+        return 0
+    return (details.get('cached_tokens') if isinstance(details, dict) else getattr(details, 'cached_tokens', 0)) or 0
+
+
+class StageMetrics:
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cached_prompt_tokens = 0
+        self.estimated_calls = 0
+        self.prompt_chars = 0
+        self.baseline_prompt_chars = 0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def to_dict(self):
+        latencies = np.asarray(self.latencies) if self.latencies else np.zeros(1)
+        saved_chars = self.baseline_prompt_chars - self.prompt_chars
+        return {
+            'calls': self.calls,
+            'errors': self.errors,
+            'prompt_tokens': self.prompt_tokens,
+            'completion_tokens': self.completion_tokens,
+            'cached_prompt_tokens': self.cached_prompt_tokens,
+            'estimated_token_calls': self.estimated_calls,
+            'prompt_chars': self.prompt_chars,
+            'baseline_prompt_chars': self.baseline_prompt_chars,
+            'estimated_prompt_tokens_saved': saved_chars // 4,
+            'prompt_savings_pct': round(saved_chars * 100 / self.baseline_prompt_chars, 1) if self.baseline_prompt_chars else 0.0,
+            'latency': {
+                'mean': float(latencies.mean()),
+                'p50': float(np.percentile(latencies, 50)),
+                'p95': float(np.percentile(latencies, 95)),
+                'max': float(latencies.max())
+            }
+        }
+
+
+class LLMMetrics:
+    """Per-stage token, latency and prompt-size counters for this process.
+
+    Token counts come from the API's usage block when it has one and from a
+    character estimate otherwise. The baseline prompt is the uncompacted form
+    of the same prompt, so the savings show what compaction is worth per stage.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.lock = threading.Lock()
+
+    def record(self, stage, prompt, completion, usage, latency, baseline_prompt=None):
+        prompt_tokens = _usage_value(usage, 'prompt_tokens')
+        completion_tokens = _usage_value(usage, 'completion_tokens')
+        with self.lock:
+            metrics = self.stages.setdefault(stage, StageMetrics())
+            metrics.calls += 1
+            if prompt_tokens is None or completion_tokens is None:
+                metrics.estimated_calls += 1
+                prompt_tokens, completion_tokens = estimate_tokens(prompt), estimate_tokens(completion)
+            metrics.prompt_tokens += prompt_tokens
+            metrics.completion_tokens += completion_tokens
+            metrics.cached_prompt_tokens += _cached_tokens(usage)
+            metrics.prompt_chars += len(prompt)
+            metrics.baseline_prompt_chars += len(baseline_prompt if baseline_prompt is not None else prompt)
+            metrics.latencies.append(latency)
+
+    def record_error(self, stage, latency):
+        with self.lock:
+            metrics = self.stages.setdefault(stage, StageMetrics())
+            metrics.errors += 1
+            metrics.latencies.append(latency)
+
+    def snapshot(self):
+        with self.lock:
+            return {stage: metrics.to_dict() for stage, metrics in self.stages.items()}
+
+    def reset(self):
+        with self.lock:
+            self.stages.clear()
+
+
+llm_metrics = LLMMetrics()
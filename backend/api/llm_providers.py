@@ -0,0 +1,128 @@
+import time
+import logging
+import threading
+from abc import ABC, abstractmethod
+import openai
+from .config import Config
+from .assistant_runs import run_assistant_with_usage, stream_assistant
+from .llm_metrics import llm_metrics
+from .openai_client import get_client, build_http_client
+
+logger = logging.getLogger(__name__)
+
+
+class LLMProvider(ABC):
+    """Answers a prompt for one of the assistants named in ``Config.ASSISTANTS``.
+
+    Every LLM-calling module goes through ``complete`` so the backend can be
+    swapped with ``Config.LLM_PROVIDER`` without touching the callers. Token
+    usage and latency of each call are recorded per assistant in llm_metrics.
+    """
+
+    name = None
+
+    def complete(self, assistant: str, prompt: str, timeout=None, baseline_prompt=None) -> str:
+        started = time.monotonic()
+        try:
+            text, usage = self.generate(assistant, prompt, timeout)
+        except Exception:
+            llm_metrics.record_error(assistant, time.monotonic() - started)
+            raise
+        llm_metrics.record(assistant, prompt, text, usage, time.monotonic() - started, baseline_prompt)
+        return text
+
+    def stream(self, assistant: str, prompt: str, timeout=None, baseline_prompt=None):
+        # Yields text deltas as they arrive; recorded like ``complete`` once the stream ends
+        started = time.monotonic()
+        parts = []
+        try:
+            deltas = self.generate_stream(assistant, prompt, timeout)
+            while True:
+                try:
+                    delta = next(deltas)
+                except StopIteration as stop:
+                    usage = stop.value
+                    break
+                parts.append(delta)
+                yield delta
+        except Exception:
+            llm_metrics.record_error(assistant, time.monotonic() - started)
+            raise
+        llm_metrics.record(assistant, prompt, ''.join(parts), usage, time.monotonic() - started, baseline_prompt)
+
+    @abstractmethod
+    def generate(self, assistant: str, prompt: str, timeout=None):
+        # Returns (text, usage); usage may be None when the backend reports none
+        ...
+
+    def generate_stream(self, assistant: str, prompt: str, timeout=None):
+        # Providers without streaming answer in one piece
+        text, usage = self.generate(assistant, prompt, timeout)
+        yield text
+        return usage
+
+
+class OpenAIProvider(LLMProvider):
+    name = 'openai'
+
+    def __init__(self, client=None):
+        self._client = client
+
+    @property
+    def client(self):
+        return self._client or get_client()
+
+    def assistant_id(self, assistant):
+        assistant_id = Config.ASSISTANTS.get(assistant)
+        if not assistant_id:
+            raise ValueError(f"No assistant ID configured for {assistant}")
+        return assistant_id
+
+    def generate(self, assistant, prompt, timeout=None):
+        return run_assistant_with_usage(self.assistant_id(assistant), prompt, timeout, client=self.client)
+
+    def generate_stream(self, assistant, prompt, timeout=None):
+        return stream_assistant(self.assistant_id(assistant), prompt, timeout, client=self.client)
+
+
+class StandinProvider(OpenAIProvider):
+    # Same threads/runs (or chat completions) code path, pointed at the local stand-in server
+    name = 'standin'
+
+    def __init__(self, base_url=None):
+        super().__init__(openai.OpenAI(
+            api_key='standin',
+            base_url=base_url or Config.LLM_STANDIN_URL,
+            http_client=build_http_client(),
+            max_retries=Config.MAX_RETRIES
+        ))
+
+    def assistant_id(self, assistant):
+        # The stand-in knows the assistants by name, so real IDs are not needed
+        return Config.ASSISTANTS.get(assistant) or assistant
+
+
+PROVIDERS = {provider.name: provider for provider in (OpenAIProvider, StandinProvider)}
+
+_provider = None
+_provider_lock = threading.Lock()
+
+
+def get_provider():
+    global _provider
+    if _provider is None:
+        with _provider_lock:
+            if _provider is None:
+                if Config.LLM_PROVIDER not in PROVIDERS:
+                    raise ValueError(f"Unknown LLM provider {Config.LLM_PROVIDER}; expected one of {sorted(PROVIDERS)}")
+                _provider = PROVIDERS[Config.LLM_PROVIDER]()
+                logger.info(f"Using LLM provider {_provider.name}")
+    return _provider
+
+
+def complete(assistant, prompt, timeout=None, baseline_prompt=None):
+    return get_provider().complete(assistant, prompt, timeout, baseline_prompt)
+
+
+def stream(assistant, prompt, timeout=None, baseline_prompt=None):
+    return get_provider().stream(assistant, prompt, timeout, baseline_prompt)
@@ -0,0 +1,418 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+import uuid
+import logging
+from flask import Flask, Response, jsonify, request
+
+from .config import Config
+from .create_question_config import DEMOGRAPHIC_VARIABLES
+
+logger = logging.getLogger(__name__)
+
+STAGES = ('question_transformer', 'question_config_generator', 'survey_analyst')
+
+# Prompt markers for when the assistant ID does not name the stage
+STAGE_MARKERS = {
+    'question_transformer': 'Transform this user input',
+    'question_config_generator': 'question_config.json',
+    'survey_analyst': 'Analyze the following survey data'
+}
+
+# Streamed answers: the first token arrives after this share of the latency, the rest spreads over the pieces
+STREAM_FIRST_TOKEN_SHARE = 0.3
+STREAM_PIECE_CHARS = 16
+
+CONFIG_VARIABLES = ['Gender', 'Age', 'Education', 'GeographicRegion']
+
+PERSONAS = [
+    ("Maria", "34", "Nurse from Phoenix, Arizona"),
+    ("James", "58", "Retired machinist from Toledo, Ohio"),
+    ("Priya", "27", "Software tester from Raleigh, North Carolina"),
+    ("Dwayne", "45", "Small business owner from Atlanta, Georgia"),
+    ("Linda", "69", "Retired teacher from Portland, Maine")
+]
+
+
+def detect_stage(assistant_id, prompt):
+    if assistant_id in STAGES:
+        return assistant_id
+    for stage, configured_id in Config.ASSISTANTS.items():
+        if configured_id and configured_id == assistant_id:
+            return stage
+    for stage, marker in STAGE_MARKERS.items():
+        if marker in prompt:
+            return stage
+    raise ValueError(f"Cannot tell which stage assistant {assistant_id} stands in for")
+
+
+def _stable_random(*parts):
+    # Same prompt, same canned answer
+    return random.Random('|'.join(str(p) for p in parts))
+
+
+def canned_transformation(prompt):
+    match = re.search(r'(?:high-quality polling question:\s*|User input: )"(.*?)"', prompt, re.S)
+    question = (match.group(1).strip() if match else "What do you think about this topic").rstrip('?.! ')
+    return {
+        "question": f"{question[:1].upper()}{question[1:]}?",
+        "type": "Likert scale",
+        "options": {
+            "a": "Strongly agree",
+            "b": "Somewhat agree",
+            "c": "Neither agree nor disagree",
+            "d": "Somewhat disagree",
+            "e": "Strongly disagree"
+        }
+    }
+
+
+def _normalized(rng, size):
+    values = [rng.random() + 0.1 for _ in range(size)]
+    total = sum(values)
+    shares = [round(v / total, 3) for v in values]
+    shares[-1] = round(1.0 - sum(shares[:-1]), 3)
+    return shares
+
+
+def canned_question_config(prompt):
+    match = re.search(r'(?:keyed by the option keys|Option keys:) (\[.*?\])', prompt)
+    option_keys = json.loads(match.group(1)) if match else []
+    option_keys = option_keys or ["a", "b", "c"]
+    config = {}
+    for variable in CONFIG_VARIABLES:
+        categories = DEMOGRAPHIC_VARIABLES[variable]
+        weights = _normalized(_stable_random(prompt, variable), len(categories))
+        config[variable] = {
+            category: {
+                "weight": weight,
+                "responses": dict(zip(option_keys, _normalized(_stable_random(prompt, variable, category), len(option_keys))))
+            }
+            for category, weight in zip(categories, weights)
+        }
+    return config
+
+
+def canned_analysis(prompt):
+    question = re.search(r'Survey Question: (.*)', prompt)
+    question = question.group(1).strip() if question else "this question"
+    answers = [(text, float(pct)) for text, pct in
+               re.findall(r'"text":\s*"(.*?)",\s*"label":\s*".*?",\s*"percentage":\s*([0-9.eE+-]+)', prompt)]
+    answers.sort(key=lambda answer: answer[1], reverse=True)
+    answers = answers or [("No answer", 0.0)]
+    top_text, top_pct = answers[0]
+    rng = _stable_random(prompt)
+    return {
+        "key_finding": f"{top_pct:.0f}% chose {top_text}",
+        "quick_stats": [f"{pct:.1f}% answered {text}." for text, pct in answers[:3]],
+        "interpretation": [
+            {
+                "name": name,
+                "age": age,
+                "description": description,
+                "quote": f"When asked \"{question}\", I'd say {rng.choice(answers)[0].lower()}."
+            }
+            for name, age, description in PERSONAS
+        ],
+        "fun_fact": f"The room went quiet when {top_pct:.0f}% landed on {top_text}."
+    }
+
+
+CANNED_RESPONSES = {
+    'question_transformer': canned_transformation,
+    'question_config_generator': canned_question_config,
+    'survey_analyst': canned_analysis
+}
+
+
+def canned_response(assistant_id, prompt):
+    return json.dumps(CANNED_RESPONSES[detect_stage(assistant_id, prompt)](prompt))
+
+
+def _estimate_tokens(text):
+    return max(1, len(text) // 4)
+
+
+class StandinState:
+    """Threads and runs held in memory, with simulated latency and failures.
+
+    A run stays in progress until its latency has passed; failures are decided
+    when the run is created, from a seeded generator, so a load test with a
+    given seed and error rate is repeatable.
+    """
+
+    def __init__(self, latency=None, jitter=None, error_rate=None, seed=None):
+        self.latency = Config.LLM_STANDIN_LATENCY if latency is None else latency
+        self.jitter = Config.LLM_STANDIN_JITTER if jitter is None else jitter
+        self.error_rate = Config.LLM_STANDIN_ERROR_RATE if error_rate is None else error_rate
+        self.rng = random.Random(Config.LLM_STANDIN_SEED if seed is None else seed)
+        self.threads = {}
+        self.lock = threading.Lock()
+
+    def draw(self):
+        # (latency, fails) for one request
+        with self.lock:
+            spread = self.latency * self.jitter
+            return max(0.0, self.rng.uniform(self.latency - spread, self.latency + spread)), self.rng.random() < self.error_rate
+
+
+def _new_id(prefix):
+    return f"{prefix}_{uuid.uuid4().hex[:24]}"
+
+
+def _message(thread_id, role, text, assistant_id=None, run_id=None):
+    return {
+        "id": _new_id('msg'),
+        "object": "thread.message",
+        "created_at": int(time.time()),
+        "thread_id": thread_id,
+        "role": role,
+        "status": "completed",
+        "content": [{"type": "text", "text": {"value": text, "annotations": []}}],
+        "assistant_id": assistant_id,
+        "run_id": run_id,
+        "attachments": [],
+        "metadata": {}
+    }
+
+
+def _message_text(message):
+    content = message.get('content', '')
+    if isinstance(content, list):
+        return ''.join(part.get('text', '') if isinstance(part.get('text'), str) else part.get('text', {}).get('value', '')
+                       for part in content)
+    return content
+
+
+def _sse(data, event=None):
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {data if isinstance(data, str) else json.dumps(data)}\n\n"
+
+
+def _stream_pieces(text, latency):
+    # Yields the text in small pieces, paced like a model generating it
+    time.sleep(latency * STREAM_FIRST_TOKEN_SHARE)
+    pieces = [text[i:i + STREAM_PIECE_CHARS] for i in range(0, len(text), STREAM_PIECE_CHARS)]
+    for piece in pieces:
+        yield piece
+        time.sleep(latency * (1 - STREAM_FIRST_TOKEN_SHARE) / len(pieces))
+
+
+def _error(message, status, error_type='invalid_request_error'):
+    return jsonify({"error": {"message": message, "type": error_type, "code": None, "param": None}}), status
+
+
+def create_standin_app(state=None):
+    app = Flask(__name__)
+    state = state or StandinState()
+
+    def get_thread(thread_id):
+        return state.threads.get(thread_id)
+
+    def run_view(thread, run):
+        # Runs advance lazily, when they are polled
+        if run['status'] == 'in_progress' and time.monotonic() >= run['_ready_at']:
+            if run['_fails']:
+                run['status'] = 'failed'
+                run['failed_at'] = int(time.time())
+                run['last_error'] = {"code": "server_error", "message": "Stand-in injected failure"}
+            else:
+                prompt = '\n'.join(_message_text(m) for m in thread['messages'] if m['role'] == 'user')
+                try:
+                    text = canned_response(run['assistant_id'], prompt)
+                except ValueError as e:
+                    run['status'] = 'failed'
+                    run['last_error'] = {"code": "invalid_prompt", "message": str(e)}
+                    return {k: v for k, v in run.items() if not k.startswith('_')}
+                thread['messages'].append(_message(thread['id'], 'assistant', text, run['assistant_id'], run['id']))
+                run['status'] = 'completed'
+                run['completed_at'] = int(time.time())
+                run['usage'] = {"prompt_tokens": _estimate_tokens(prompt), "completion_tokens": _estimate_tokens(text),
+                                "total_tokens": _estimate_tokens(prompt) + _estimate_tokens(text)}
+        return {k: v for k, v in run.items() if not k.startswith('_')}
+
+    @app.route('/v1/threads', methods=['POST'])
+    def create_thread():
+        body = request.get_json(silent=True) or {}
+        thread_id = _new_id('thread')
+        thread = {"id": thread_id, "messages": [], "runs": {}}
+        for message in body.get('messages', []):
+            thread['messages'].append(_message(thread_id, message.get('role', 'user'), _message_text(message)))
+        with state.lock:
+            state.threads[thread_id] = thread
+        return jsonify({"id": thread_id, "object": "thread", "created_at": int(time.time()),
+                        "metadata": {}, "tool_resources": None})
+
+    @app.route('/v1/threads/<thread_id>', methods=['DELETE'])
+    def delete_thread(thread_id):
+        with state.lock:
+            state.threads.pop(thread_id, None)
+        return jsonify({"id": thread_id, "object": "thread.deleted", "deleted": True})
+
+    @app.route('/v1/threads/<thread_id>/messages', methods=['POST'])
+    def create_message(thread_id):
+        thread = get_thread(thread_id)
+        if thread is None:
+            return _error(f"No thread found with id '{thread_id}'.", 404)
+        body = request.get_json(silent=True) or {}
+        message = _message(thread_id, body.get('role', 'user'), _message_text(body))
+        thread['messages'].append(message)
+        return jsonify(message)
+
+    @app.route('/v1/threads/<thread_id>/messages', methods=['GET'])
+    def list_messages(thread_id):
+        thread = get_thread(thread_id)
+        if thread is None:
+            return _error(f"No thread found with id '{thread_id}'.", 404)
+        messages = list(thread['messages'])
+        if request.args.get('order', 'desc') == 'desc':
+            messages.reverse()
+        messages = messages[:int(request.args.get('limit', 20))]
+        return jsonify({"object": "list", "data": messages, "has_more": False,
+                        "first_id": messages[0]['id'] if messages else None,
+                        "last_id": messages[-1]['id'] if messages else None})
+
+    @app.route('/v1/threads/<thread_id>/runs', methods=['POST'])
+    def create_run(thread_id):
+        thread = get_thread(thread_id)
+        if thread is None:
+            return _error(f"No thread found with id '{thread_id}'.", 404)
+        body = request.get_json(silent=True) or {}
+        latency, fails = state.draw()
+        run = {
+            "id": _new_id('run'),
+            "object": "thread.run",
+            "created_at": int(time.time()),
+            "thread_id": thread_id,
+            "assistant_id": body.get('assistant_id'),
+            "status": "in_progress",
+            "model": "standin",
+            "instructions": "",
+            "tools": [],
+            "metadata": {},
+            "last_error": None,
+            "usage": None,
+            "_ready_at": time.monotonic() + latency,
+            "_fails": fails
+        }
+        thread['runs'][run['id']] = run
+        if body.get('stream'):
+            return Response(stream_run(thread, run, latency), mimetype='text/event-stream')
+        return jsonify(run_view(thread, run))
+
+    def stream_run(thread, run, latency):
+        yield _sse(run_view(thread, run), 'thread.run.created')
+        message_id = _new_id('msg')
+        if not run['_fails']:
+            prompt = '\n'.join(_message_text(m) for m in thread['messages'] if m['role'] == 'user')
+            try:
+                text = canned_response(run['assistant_id'], prompt)
+            except ValueError:
+                text = ''
+            for piece in _stream_pieces(text, latency):
+                yield _sse({"id": message_id, "object": "thread.message.delta",
+                            "delta": {"content": [{"index": 0, "type": "text", "text": {"value": piece, "annotations": []}}]}},
+                           'thread.message.delta')
+        else:
+            time.sleep(latency)
+        run['_ready_at'] = 0
+        view = run_view(thread, run)
+        if view['status'] == 'completed':
+            yield _sse(thread['messages'][-1], 'thread.message.completed')
+        yield _sse(view, f"thread.run.{view['status']}")
+        yield _sse('[DONE]', 'done')
+
+    @app.route('/v1/threads/<thread_id>/runs/<run_id>', methods=['GET'])
+    def retrieve_run(thread_id, run_id):
+        thread = get_thread(thread_id)
+        run = thread['runs'].get(run_id) if thread else None
+        if run is None:
+            return _error(f"No run found with id '{run_id}'.", 404)
+        return jsonify(run_view(thread, run))
+
+    @app.route('/v1/threads/<thread_id>/runs/<run_id>/cancel', methods=['POST'])
+    def cancel_run(thread_id, run_id):
+        thread = get_thread(thread_id)
+        run = thread['runs'].get(run_id) if thread else None
+        if run is None:
+            return _error(f"No run found with id '{run_id}'.", 404)
+        if run['status'] == 'in_progress':
+            run['status'] = 'cancelled'
+            run['cancelled_at'] = int(time.time())
+        return jsonify(run_view(thread, run))
+
+    @app.route('/v1/assistants/<assistant_id>', methods=['GET'])
+    def retrieve_assistant(assistant_id):
+        return jsonify({
+            "id": assistant_id,
+            "object": "assistant",
+            "created_at": int(time.time()),
+            "name": f"Stand-in {assistant_id}",
+            "description": None,
+            "model": f"standin:{assistant_id}",
+            "instructions": "Respond only with JSON.",
+            "tools": [],
+            "metadata": {},
+            "temperature": 1.0,
+            "top_p": 1.0,
+            "response_format": "auto"
+        })
+
+    @app.route('/v1/chat/completions', methods=['POST'])
+    def chat_completions():
+        body = request.get_json(silent=True) or {}
+        latency, fails = state.draw()
+        if body.get('stream') and not fails:
+            return Response(stream_chat(body, latency), mimetype='text/event-stream')
+        time.sleep(latency)
+        if fails:
+            return _error("Stand-in injected failure", 500, 'server_error')
+        model = body.get('model', '')
+        prompt = '\n'.join(_message_text(m) for m in body.get('messages', []) if m.get('role') == 'user')
+        try:
+            text = canned_response(model.split(':', 1)[-1], prompt)
+        except ValueError as e:
+            return _error(str(e), 400)
+        prompt_tokens, completion_tokens = _estimate_tokens(prompt), _estimate_tokens(text)
+        return jsonify({
+            "id": _new_id('chatcmpl'),
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "finish_reason": "stop", "logprobs": None,
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                      "total_tokens": prompt_tokens + completion_tokens}
+        })
+
+    def stream_chat(body, latency):
+        model = body.get('model', '')
+        prompt = '\n'.join(_message_text(m) for m in body.get('messages', []) if m.get('role') == 'user')
+        text = canned_response(model.split(':', 1)[-1], prompt)
+        chunk = {"id": _new_id('chatcmpl'), "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        for piece in _stream_pieces(text, latency):
+            yield _sse(dict(chunk, choices=[{"index": 0, "delta": {"content": piece}, "finish_reason": None}]))
+        yield _sse(dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}]))
+        if (body.get('stream_options') or {}).get('include_usage'):
+            prompt_tokens, completion_tokens = _estimate_tokens(prompt), _estimate_tokens(text)
+            yield _sse(dict(chunk, choices=[], usage={"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens,
+                                                      "total_tokens": prompt_tokens + completion_tokens}))
+        yield _sse('[DONE]')
+
+    return app
+
+
+def serve(host='127.0.0.1', port=5055):
+    # Threaded so concurrent runs overlap the way they would against the real API
+    logger.info(f"LLM stand-in listening on {host}:{port} (latency {Config.LLM_STANDIN_LATENCY}s, "
+                f"error rate {Config.LLM_STANDIN_ERROR_RATE})")
+    create_standin_app().run(host=host, port=port, threaded=True)
+
+
+if __name__ == '__main__':
+    # python -m backend.api.llm_standin, then run the app with LLM_PROVIDER=standin
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
+    serve(port=int(os.environ.get('LLM_STANDIN_PORT', 5055)))
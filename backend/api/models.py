@@ -1,27 +1,65 @@
 from . import db
 import json
+import hashlib
 import logging
+from collections import Counter
 from datetime import datetime
-from sqlalchemy import Index
+from sqlalchemy import Index, UniqueConstraint, func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from .unit_of_work import current_unit_of_work, write_stats
+from .survey_data_cache import lookup, remember_read, remember_write
+from .survey_codec import JSON, decode, encode
 
 class SurveyData(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.String(64), nullable=True, index=True)
     session_id = db.Column(db.String(64), nullable=False, index=True)
     data_type = db.Column(db.String(50), nullable=False)
-    content = db.Column(db.Text, nullable=False)
+    # Rows written before blobs existed keep their payload inline; newer rows reference a ContentBlob
+    content = db.Column(db.Text, nullable=True)
+    blob_hash = db.Column(db.String(64), db.ForeignKey('content_blob.hash'), nullable=True, index=True)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow, index=True)
 
+    blob = db.relationship('ContentBlob', lazy='joined')
+
     __table_args__ = (
         Index('idx_session_data_type', 'session_id', 'data_type'),
     )
 
+    @property
+    def payload(self):
+        # Decoded content, whether held by a blob or inline JSON text from before blobs existed
+        return self.blob.payload if self.blob_hash else decode(JSON, self.content)
+
     @classmethod
-    def save_data(cls, user_id, session_id, data_type, content):
+    def insert_rows(cls, rows):
+        # Bulk-inserts row dicts carrying 'codec' and encoded 'content', storing each distinct payload once; the caller commits
+        payloads, references, prepared = {}, Counter(), []
+        for row in rows:
+            digest = ContentBlob.content_hash(row['codec'], row['content'])
+            payloads[digest] = (row['codec'], row['content'])
+            references[digest] += 1
+            fields = {key: value for key, value in row.items() if key not in ('codec', 'content')}
+            prepared.append(dict(fields, blob_hash=digest))
+        ContentBlob.add_references(payloads, references)
+        db.session.execute(insert(cls), prepared)
+
+    @classmethod
+    def save_data(cls, user_id, session_id, data_type, content, durable=False):
+        # Inside a unit of work the row is queued for its single commit, unless the caller needs it durable now
+        codec, encoded = encode(content)
+        unit = current_unit_of_work()
+        if unit is not None and not durable:
+            unit.add({"user_id": user_id, "session_id": session_id, "data_type": data_type,
+                      "codec": codec, "content": encoded, "timestamp": datetime.utcnow()})
+            logging.info(f"Data queued in unit of work. User ID: {user_id}, Session ID: {session_id}, Type: {data_type}")
+            return
         try:
-            data = cls(user_id=user_id, session_id=session_id, data_type=data_type, content=json.dumps(content))
-            db.session.add(data)
+            cls.insert_rows([{"user_id": user_id, "session_id": session_id, "data_type": data_type,
+                              "codec": codec, "content": encoded, "timestamp": datetime.utcnow()}])
             db.session.commit()
+            write_stats.record(immediate_commits=1, rows_written=1)
+            remember_write(user_id, session_id, data_type, codec, encoded)
             logging.info(f"Data saved successfully. User ID: {user_id}, Session ID: {session_id}, Type: {data_type}")
         except Exception as e:
             db.session.rollback()
@@ -31,16 +69,160 @@ class SurveyData(db.Model):
     @classmethod
     def get_data(cls, session_id, data_type, user_id=None):
         try:
+            unit = current_unit_of_work()
+            pending = unit.latest(session_id, data_type, user_id) if unit is not None else None
+            if pending is not None:
+                return decode(pending['codec'], pending['content'])
+            # Identity map for this request, then the shared LRU, then the database
+            key = (session_id, data_type, user_id)
+            cached = lookup(key)
+            if cached is not None:
+                return cached
             query = cls.query.filter_by(session_id=session_id, data_type=data_type)
             if user_id:
                 query = query.filter_by(user_id=user_id)
             data = query.order_by(cls.timestamp.desc()).first()
             if data:
                 logging.info(f"Data retrieved successfully. User ID: {user_id}, Session ID: {session_id}, Type: {data_type}")
-                return json.loads(data.content)
+                value = data.payload
+                remember_read(key, value)
+                return value
             else:
                 logging.warning(f"No data found. User ID: {user_id}, Session ID: {session_id}, Type: {data_type}")
                 return None
         except Exception as e:
             logging.error(f"Error retrieving data: {str(e)}")
-            return None
\ No newline at end of file
+            return None
+
+
+class ContentBlob(db.Model):
+    """A SurveyData payload stored once, keyed by the SHA-256 of its codec and bytes.
+
+    New payloads live in ``data`` as msgspec JSON or MessagePack, possibly
+    zlib-compressed, as named by ``codec``; blobs from before codecs existed
+    keep their JSON text in ``content``. ``refcount`` counts the SurveyData
+    rows pointing at the blob. Blobs whose count has dropped to zero are
+    removed by ``collect_garbage``, which first recounts so rows deleted with
+    raw SQL are accounted for.
+    """
+    hash = db.Column(db.String(64), primary_key=True)
+    codec = db.Column(db.String(16), nullable=False, default=JSON, server_default=JSON)
+    content = db.Column(db.Text, nullable=True)
+    data = db.Column(db.LargeBinary, nullable=True)
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_blob_refcount', 'refcount'),
+    )
+
+    @property
+    def payload(self):
+        return decode(self.codec, self.data if self.data is not None else self.content)
+
+    @staticmethod
+    def content_hash(codec, encoded):
+        return hashlib.sha256(codec.encode('ascii') + b'\0' + encoded).hexdigest()
+
+    @classmethod
+    def add_references(cls, payloads, references):
+        # Inserts new blobs and bumps the count of existing ones, in the caller's transaction
+        if not payloads:
+            return
+        now = datetime.utcnow()
+        values = [{"hash": digest, "codec": codec, "content": None, "data": encoded, "size": len(encoded),
+                   "refcount": references[digest], "created_at": now}
+                  for digest, (codec, encoded) in payloads.items()]
+        dialect = {'sqlite': sqlite, 'postgresql': postgresql}.get(db.session.get_bind().dialect.name)
+        if dialect is not None:
+            stmt = dialect.insert(cls).values(values)
+            db.session.execute(stmt.on_conflict_do_update(
+                index_elements=['hash'], set_={'refcount': cls.refcount + stmt.excluded.refcount}))
+            return
+        for value in values:
+            blob = db.session.get(cls, value['hash'], with_for_update=True)
+            if blob is None:
+                db.session.add(cls(**value))
+            else:
+                blob.refcount += value['refcount']
+
+    @classmethod
+    def collect_garbage(cls):
+        try:
+            referencing = select(func.count(SurveyData.id)).where(SurveyData.blob_hash == cls.hash).scalar_subquery()
+            db.session.execute(db.update(cls).values(refcount=referencing))
+            removed = db.session.execute(db.delete(cls).where(cls.refcount <= 0)).rowcount
+            db.session.commit()
+            logging.info(f"Removed {removed} unreferenced content blobs")
+            return removed
+        except Exception as e:
+            db.session.rollback()
+            logging.error(f"Error collecting content blobs: {str(e)}")
+            raise
+
+
+class CacheEntry(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    namespace = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(64), nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    last_used_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    hits = db.Column(db.Integer, default=0, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('namespace', 'key', name='uq_cache_namespace_key'),
+        Index('idx_cache_namespace_last_used', 'namespace', 'last_used_at'),
+    )
+
+
+class Job(db.Model):
+    id = db.Column(db.String(36), primary_key=True)
+    user_id = db.Column(db.String(64), nullable=True, index=True)
+    session_id = db.Column(db.String(64), nullable=True, index=True)
+    kind = db.Column(db.String(50), nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    # Only jobs from before JobEvent existed have their events here
+    progress = db.Column(db.Text, nullable=False, default='[]')
+    result = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    def events(self, after=0):
+        # Progress events in the order they were reported, skipping the first ``after``
+        rows = JobEvent.query.filter_by(job_id=self.id).order_by(JobEvent.id).offset(after).all()
+        if rows:
+            return [row.to_dict() for row in rows]
+        return json.loads(self.progress)[after:]
+
+    def to_dict(self, include_result=True, after=0):
+        data = {
+            "job_id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.events(after),
+            "error": self.error,
+            "created_at": self.created_at.isoformat(),
+            "updated_at": self.updated_at.isoformat()
+        }
+        if include_result:
+            data["result"] = json.loads(self.result) if self.result else None
+        return data
+
+
+class JobEvent(db.Model):
+    # One row per reported progress event, so reporting appends instead of rewriting the job
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(36), db.ForeignKey('job.id'), nullable=False)
+    event = db.Column(db.String(50), nullable=False)
+    data = db.Column(db.Text, nullable=False, default='{}')
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+
+    __table_args__ = (
+        Index('idx_job_event_job_id', 'job_id', 'id'),
+    )
+
+    def to_dict(self):
+        return dict(json.loads(self.data), event=self.event, at=self.created_at.isoformat())
@@ -0,0 +1,44 @@
+import logging
+import threading
+import httpx
+import openai
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def _http2_available():
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def build_http_client():
+    limits = httpx.Limits(
+        max_connections=Config.OPENAI_MAX_CONNECTIONS,
+        max_keepalive_connections=Config.OPENAI_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=Config.OPENAI_KEEPALIVE_EXPIRY
+    )
+    timeout = httpx.Timeout(Config.OPENAI_REQUEST_TIMEOUT, connect=Config.OPENAI_CONNECT_TIMEOUT)
+    http2 = Config.OPENAI_HTTP2 and _http2_available()
+    logger.info(f"OpenAI transport: pool of {Config.OPENAI_MAX_CONNECTIONS} connections, http2={http2}")
+    return httpx.Client(limits=limits, timeout=timeout, http2=http2)
+
+
+def get_client():
+    # One client, and so one connection pool, per process for every LLM-calling module
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = openai.OpenAI(
+                    api_key=Config.OPENAI_API_KEY,
+                    http_client=build_http_client(),
+                    max_retries=Config.MAX_RETRIES
+                )
+    return _client
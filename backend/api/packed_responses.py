@@ -0,0 +1,79 @@
+import base64
+import logging
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .profile_store import ProfileStore
+
+logger = logging.getLogger(__name__)
+
+PACKED_FORMAT = 'packed-v1'
+
+# Explicit little-endian dtypes so stored payloads decode the same on any host
+ID_DTYPE = '<i4'
+CODE_DTYPE = '<i2'
+WEIGHT_DTYPE = '<f4'
+
+
+def _encode_array(values: np.ndarray, dtype: str) -> str:
+    return base64.b64encode(np.ascontiguousarray(values, dtype=dtype).tobytes()).decode('ascii')
+
+
+def _decode_array(encoded: str, dtype: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype=dtype)
+
+
+def is_packed(individual_responses: Any) -> bool:
+    return isinstance(individual_responses, dict) and individual_responses.get('format') == PACKED_FORMAT
+
+
+def pack_responses(store: ProfileStore, rows: np.ndarray, codes: np.ndarray, weights: np.ndarray,
+                   options: List[str]) -> Dict[str, Any]:
+    return {
+        'format': PACKED_FORMAT,
+        'snapshot_version': store.version,
+        'count': int(len(rows)),
+        'options': list(options),
+        'profile_ids': _encode_array(store.profile_ids[rows], ID_DTYPE),
+        'answers': _encode_array(codes, CODE_DTYPE),
+        'weights': _encode_array(weights, WEIGHT_DTYPE)
+    }
+
+
+def unpack_arrays(packed: Dict[str, Any]):
+    return (_decode_array(packed['profile_ids'], ID_DTYPE),
+            _decode_array(packed['answers'], CODE_DTYPE),
+            _decode_array(packed['weights'], WEIGHT_DTYPE))
+
+
+def response_count(individual_responses: Any) -> int:
+    if is_packed(individual_responses):
+        return individual_responses['count']
+    return len(individual_responses or [])
+
+
+def unpack_rows(packed: Dict[str, Any], store: ProfileStore):
+    profile_ids, codes, weights = unpack_arrays(packed)
+    if packed.get('snapshot_version') != store.version:
+        logger.warning(f"Responses were packed against profile snapshot {packed.get('snapshot_version')}, "
+                       f"current is {store.version}; matching by ProfileID")
+    return store.rows_for_ids(profile_ids), codes, weights
+
+
+def rehydrate_responses(individual_responses: Any, store: Optional[ProfileStore] = None,
+                        include_demographics: bool = True) -> List[Dict[str, Any]]:
+    # Legacy rows already hold the expanded list
+    if not is_packed(individual_responses):
+        return individual_responses or []
+    packed = individual_responses
+    options = np.asarray(packed['options'], dtype=object)
+    if not include_demographics:
+        profile_ids, codes, weights = unpack_arrays(packed)
+        return [
+            {"profile_id": profile_id, "response": answer, "weight": weight}
+            for profile_id, answer, weight in zip(profile_ids.tolist(), options[codes], weights.tolist())
+        ]
+    rows, codes, weights = unpack_rows(packed, store)
+    return [
+        {"demographics": demographics, "response": answer, "weight": weight}
+        for demographics, answer, weight in zip(store.to_frame(rows).to_dict('records'), options[codes], weights.tolist())
+    ]
@@ -0,0 +1,85 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from .unit_of_work import activate, current_unit_of_work
+from .survey_data_cache import request_identity_map, share_identity_map
+
+logger = logging.getLogger(__name__)
+
+
+class Stage:
+    def __init__(self, name: str, func: Callable[[Dict[str, Any]], Any], deps: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+
+
+class Pipeline:
+    """Runs a DAG of stages, starting each one as soon as its dependencies finish.
+
+    A stage function receives a dict of its dependencies' results. Stages run on
+    worker threads inside their own Flask app context, so each one gets its own
+    database session, and inside the caller's unit of work if one is active,
+    so their SurveyData writes share its single commit. They also read through
+    the caller's SurveyData identity map, so each payload is loaded once per run.
+    The first failing stage stops the pipeline and its exception is re-raised
+    once the stages already running have finished.
+    """
+
+    def __init__(self, stages: List[Stage], max_workers: Optional[int] = None):
+        names = {stage.name for stage in stages}
+        for stage in stages:
+            missing = set(stage.deps) - names
+            if missing:
+                raise ValueError(f"Stage {stage.name} depends on unknown stages {sorted(missing)}")
+        self.stages = stages
+        self.max_workers = max_workers or len(stages)
+
+    def run(self, app=None, on_stage_done: Optional[Callable[[str, float], None]] = None):
+        results, timings = {}, {}
+        pending = {stage.name: stage for stage in self.stages}
+        running = {}
+        started = time.monotonic()
+        unit = current_unit_of_work()
+        identity_map = request_identity_map()
+        if identity_map is None:
+            identity_map = {}
+
+        def call(stage, inputs):
+            stage_start = time.monotonic()
+            with activate(unit), share_identity_map(identity_map):
+                if app is not None:
+                    with app.app_context():
+                        value = stage.func(inputs)
+                else:
+                    value = stage.func(inputs)
+            return value, time.monotonic() - stage_start
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='pipeline') as executor:
+            error = None
+            while (pending or running) and error is None:
+                for name, stage in list(pending.items()):
+                    if all(dep in results for dep in stage.deps):
+                        inputs = {dep: results[dep] for dep in stage.deps}
+                        running[executor.submit(call, stage, inputs)] = name
+                        del pending[name]
+                if not running:
+                    raise RuntimeError(f"Pipeline has a dependency cycle among {sorted(pending)}")
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    try:
+                        results[name], timings[name] = future.result()
+                    except Exception as e:
+                        logger.error(f"Pipeline stage {name} failed: {str(e)}")
+                        error = error or e
+                        continue
+                    logger.info(f"Pipeline stage {name} finished in {timings[name]:.3f}s")
+                    if on_stage_done is not None:
+                        on_stage_done(name, timings[name])
+            # Leaving the executor waits for stages that were already running
+        if error is not None:
+            raise error
+        timings['total'] = time.monotonic() - started
+        return results, timings
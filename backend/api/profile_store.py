@@ -0,0 +1,239 @@
+import os
+import json
+import hashlib
+import logging
+import shutil
+import tempfile
+import re
+import threading
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+import pandas as pd
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+ID_COLUMN = 'ProfileID'
+
+_store = None
+_store_lock = threading.Lock()
+
+
+class ProfileStore:
+    """Columnar, read-only view of the synthetic respondent profiles.
+
+    Every demographic column is held as an integer code array into a sorted
+    list of categories, so samplers and engines work on row indices and codes
+    instead of DataFrames of strings.
+    """
+
+    def __init__(self, profile_ids: np.ndarray, codes: np.ndarray, columns: List[str],
+                 categories: Dict[str, list], version: str):
+        self.profile_ids = profile_ids
+        self.codes = codes
+        self.columns = columns
+        self.categories = categories
+        self.version = version
+        self._column_index = {name: i for i, name in enumerate(columns)}
+        self._category_arrays = {name: np.asarray(cats, dtype=object) for name, cats in categories.items()}
+        self._frame = None
+        self._id_order = None
+        self._encodings = {}
+        self._encoding_lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self.profile_ids)
+
+    def column_codes(self, column: str) -> np.ndarray:
+        return self.codes[:, self._column_index[column]]
+
+    def decode(self, column: str, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        codes = self.column_codes(column)
+        if rows is not None:
+            codes = codes[rows]
+        return self._category_arrays[column][codes]
+
+    def encode(self, column: str, categories: Sequence[str]) -> np.ndarray:
+        """Map every profile onto an external category list.
+
+        Returns one code per profile indexing into ``categories``, or -1 where
+        the profile value has no matching category. Numeric columns (Age) are
+        bucketed using bracket labels such as ``18-24`` or ``65+``.
+        """
+        key = (column, tuple(categories))
+        encoded = self._encodings.get(key)
+        if encoded is None:
+            lookup = _category_lookup(self.categories[column], categories)
+            encoded = lookup[self.column_codes(column)]
+            encoded.flags.writeable = False
+            with self._encoding_lock:
+                self._encodings[key] = encoded
+        return encoded
+
+    def rows_for_ids(self, profile_ids: np.ndarray) -> np.ndarray:
+        if self._id_order is None:
+            self._id_order = np.argsort(self.profile_ids, kind='stable')
+        profile_ids = np.asarray(profile_ids)
+        sorted_ids = self.profile_ids[self._id_order]
+        positions = np.searchsorted(sorted_ids, profile_ids)
+        positions = np.minimum(positions, len(sorted_ids) - 1)
+        if not np.array_equal(sorted_ids[positions], profile_ids):
+            raise KeyError("Unknown ProfileID in packed responses")
+        return self._id_order[positions]
+
+    def to_frame(self, rows: Optional[np.ndarray] = None) -> pd.DataFrame:
+        if rows is None:
+            # The full frame is only built once and then shared
+            if self._frame is None:
+                self._frame = self._build_frame(None)
+            return self._frame
+        return self._build_frame(np.asarray(rows))
+
+    def _build_frame(self, rows: Optional[np.ndarray]) -> pd.DataFrame:
+        ids = self.profile_ids if rows is None else self.profile_ids[rows]
+        data = {ID_COLUMN: ids}
+        for column in self.columns:
+            data[column] = self.decode(column, rows)
+        return pd.DataFrame(data)
+
+
+def _parse_bracket(label: str):
+    match = re.fullmatch(r'\s*(\d+)\s*(?:-\s*(\d+)|\+)\s*', str(label))
+    if not match:
+        return None
+    low = int(match.group(1))
+    high = int(match.group(2)) if match.group(2) else np.inf
+    return low, high
+
+
+def _category_lookup(values: list, categories: Sequence[str]) -> np.ndarray:
+    # Translates store codes for one column into codes over ``categories``
+    lookup = np.full(len(values), -1, dtype=np.int16)
+    if values and all(isinstance(v, (int, float)) for v in values):
+        brackets = [_parse_bracket(c) for c in categories]
+        for code, value in enumerate(values):
+            for index, bracket in enumerate(brackets):
+                if bracket and bracket[0] <= value <= bracket[1]:
+                    lookup[code] = index
+                    break
+    else:
+        positions = {str(c): i for i, c in enumerate(categories)}
+        for code, value in enumerate(values):
+            lookup[code] = positions.get(str(value), -1)
+    return lookup
+
+
+def _source_path() -> str:
+    return os.path.join(Config.DATA_DIR, 'american_profiles_2024.json')
+
+
+def _snapshot_path(source_path: str) -> str:
+    return os.path.splitext(source_path)[0] + '.snapshot'
+
+
+def _source_signature(source_path: str) -> Dict[str, int]:
+    stat = os.stat(source_path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+def _code_dtype(max_categories: int):
+    for dtype in (np.int8, np.int16, np.int32):
+        if max_categories <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def build_from_json(source_path: str) -> ProfileStore:
+    with open(source_path, 'rb') as file:
+        raw = file.read()
+    profiles_data = json.loads(raw)
+    profiles_df = pd.DataFrame(profiles_data)
+    columns = [c for c in profiles_df.columns if c != ID_COLUMN]
+
+    categories = {}
+    encoded = []
+    for column in columns:
+        categorical = pd.Categorical(profiles_df[column])
+        categories[column] = categorical.categories.tolist()
+        encoded.append(categorical.codes)
+
+    dtype = _code_dtype(max(len(cats) for cats in categories.values()))
+    # Fortran order keeps each column contiguous on disk and in memory
+    codes = np.asfortranarray(np.column_stack(encoded).astype(dtype))
+    profile_ids = profiles_df[ID_COLUMN].to_numpy(dtype=np.int32)
+    version = hashlib.sha1(raw).hexdigest()[:12]
+    logger.info(f"Built profile store from JSON: {len(profile_ids)} profiles, {len(columns)} columns, version {version}")
+    return ProfileStore(profile_ids, codes, columns, categories, version)
+
+
+def write_snapshot(store: ProfileStore, snapshot_path: str, source_signature: Dict[str, int]):
+    parent = os.path.dirname(snapshot_path)
+    tmp_dir = tempfile.mkdtemp(prefix='.profiles-', dir=parent)
+    try:
+        np.save(os.path.join(tmp_dir, 'codes.npy'), store.codes)
+        np.save(os.path.join(tmp_dir, 'profile_ids.npy'), store.profile_ids)
+        meta = {
+            'format': SNAPSHOT_FORMAT,
+            'version': store.version,
+            'source': source_signature,
+            'columns': store.columns,
+            'categories': store.categories,
+        }
+        with open(os.path.join(tmp_dir, 'meta.json'), 'w') as file:
+            json.dump(meta, file)
+        # Swap the directory in atomically so concurrent workers never see a partial snapshot
+        if os.path.isdir(snapshot_path):
+            shutil.rmtree(snapshot_path, ignore_errors=True)
+        os.replace(tmp_dir, snapshot_path)
+        logger.info(f"Profile snapshot written to {snapshot_path}")
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+
+def read_snapshot(snapshot_path: str, source_signature: Optional[Dict[str, int]] = None) -> Optional[ProfileStore]:
+    meta_path = os.path.join(snapshot_path, 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r') as file:
+        meta = json.load(file)
+    if meta.get('format') != SNAPSHOT_FORMAT:
+        logger.info("Profile snapshot format changed, rebuilding")
+        return None
+    if source_signature is not None and meta.get('source') != source_signature:
+        logger.info("Profile snapshot is stale, rebuilding")
+        return None
+    # Memory-mapped so that every worker process shares the same pages
+    codes = np.load(os.path.join(snapshot_path, 'codes.npy'), mmap_mode='r')
+    profile_ids = np.load(os.path.join(snapshot_path, 'profile_ids.npy'), mmap_mode='r')
+    return ProfileStore(profile_ids, codes, meta['columns'], meta['categories'], meta['version'])
+
+
+def load_profile_store(source_path: Optional[str] = None) -> ProfileStore:
+    source_path = source_path or _source_path()
+    snapshot_path = _snapshot_path(source_path)
+    signature = _source_signature(source_path)
+    try:
+        store = read_snapshot(snapshot_path, signature)
+        if store is not None:
+            logger.info(f"Profile store loaded from snapshot {snapshot_path}, version {store.version}")
+            return store
+    except Exception as e:
+        logger.warning(f"Could not read profile snapshot, falling back to JSON: {str(e)}")
+    store = build_from_json(source_path)
+    try:
+        write_snapshot(store, snapshot_path, signature)
+    except Exception as e:
+        # A read-only deployment still works, it just pays the JSON parse per process
+        logger.warning(f"Could not write profile snapshot: {str(e)}")
+    return store
+
+
+def get_profile_store() -> ProfileStore:
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = load_profile_store()
+    return _store
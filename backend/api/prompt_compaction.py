@@ -0,0 +1,20 @@
+import json
+
+
+def compact_json(value):
+    return json.dumps(value, separators=(',', ':'), ensure_ascii=False)
+
+
+def compact_text(text):
+    # Drops the indentation and blank lines that triple-quoted prompts carry
+    return '\n'.join(line.strip() for line in text.strip().splitlines() if line.strip())
+
+
+def round_floats(value, digits=2):
+    if isinstance(value, float):
+        return round(value, digits)
+    if isinstance(value, dict):
+        return {k: round_floats(v, digits) for k, v in value.items()}
+    if isinstance(value, list):
+        return [round_floats(v, digits) for v in value]
+    return value
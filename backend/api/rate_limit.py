@@ -0,0 +1,72 @@
+import time
+import threading
+
+
+class RateLimitTimeout(Exception):
+    pass
+
+
+class TokenBucket:
+    # A rate of 0 or less means unlimited
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        if self.rate > 0:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount):
+        if self.rate <= 0 or amount <= self.tokens:
+            return 0.0
+        return (amount - self.tokens) / self.rate
+
+    def take(self, amount):
+        if self.rate > 0:
+            self.tokens -= amount
+
+
+class RateLimiter:
+    """Blocks callers until both the request and the token budget allow a call.
+
+    Requests per second and tokens per minute are two token buckets checked
+    and debited together under one lock, so a caller never holds one budget
+    while waiting on the other. A single call asking for more tokens than the
+    bucket holds is capped at the bucket size rather than waiting forever.
+    """
+
+    def __init__(self, requests_per_second, tokens_per_minute, burst=None):
+        self.requests = TokenBucket(requests_per_second, burst or max(1.0, requests_per_second))
+        self.tokens = TokenBucket(tokens_per_minute / 60.0, tokens_per_minute)
+        self.lock = threading.Lock()
+        self.waits = 0
+        self.waited_seconds = 0.0
+
+    def acquire(self, tokens=0, timeout=None):
+        tokens = min(tokens, self.tokens.capacity) if self.tokens.rate > 0 else 0
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        waited = False
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.requests.refill(now)
+                self.tokens.refill(now)
+                wait = max(self.requests.wait_time(1), self.tokens.wait_time(tokens))
+                if wait == 0:
+                    self.requests.take(1)
+                    self.tokens.take(tokens)
+                    return
+                if not waited:
+                    self.waits += 1
+                    waited = True
+                self.waited_seconds += wait
+            if deadline is not None and now + wait > deadline:
+                raise RateLimitTimeout(f"Rate limit budget not available within {timeout}s")
+            time.sleep(wait)
+
+    def stats(self):
+        with self.lock:
+            return {'waits': self.waits, 'waited_seconds': round(self.waited_seconds, 3)}
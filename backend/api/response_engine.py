@@ -0,0 +1,121 @@
+import logging
+import numbers
+from typing import Any, Dict, List, Optional
+import numpy as np
+from .create_question_config import DEMOGRAPHIC_VARIABLES
+from .profile_store import ProfileStore
+from .response_sampler import question_options
+
+logger = logging.getLogger(__name__)
+
+# Floor applied before taking logs so a zero in the config never makes an option impossible
+MIN_PROBABILITY = 1e-4
+
+
+class CompiledQuestionConfig:
+    """A question_config turned into per-variable lookup tables.
+
+    ``tables[v]`` has one row per category in ``DEMOGRAPHIC_VARIABLES[v]`` plus a
+    trailing neutral row, and one column per answer option. Rows hold log
+    probabilities, so profiles that do not match any category (code -1) pick
+    up the neutral row without any special casing.
+    """
+
+    def __init__(self, variables: List[str], tables: List[np.ndarray],
+                 composition: Dict[str, np.ndarray], num_options: int):
+        self.variables = variables
+        self.tables = tables
+        self.composition = composition
+        self.num_options = num_options
+
+    @property
+    def conditions_responses(self) -> bool:
+        return bool(self.variables)
+
+    def probabilities(self, store: ProfileStore, rows: np.ndarray) -> np.ndarray:
+        rows = np.asarray(rows)
+        log_probs = np.zeros((len(rows), self.num_options))
+        for variable, table in zip(self.variables, self.tables):
+            codes = store.encode(variable, DEMOGRAPHIC_VARIABLES[variable])[rows]
+            log_probs += table[codes]
+        if self.variables:
+            # Geometric pooling keeps several agreeing variables from collapsing onto one option
+            log_probs /= len(self.variables)
+        log_probs -= log_probs.max(axis=1, keepdims=True)
+        probabilities = np.exp(log_probs)
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        return probabilities
+
+
+def _option_index(labels: List[str], texts: List[str]) -> Dict[str, int]:
+    index = {}
+    for i, (label, text) in enumerate(zip(labels, texts)):
+        index[label.strip().lower()] = i
+        index[text.strip().lower()] = i
+    return index
+
+
+def _response_row(responses: Dict[str, Any], option_index: Dict[str, int], num_options: int) -> Optional[np.ndarray]:
+    row = np.full(num_options, np.nan)
+    for option, probability in responses.items():
+        position = option_index.get(str(option).strip().lower())
+        if position is not None and isinstance(probability, numbers.Number):
+            row[position] = max(float(probability), 0.0)
+    if np.isnan(row).all():
+        return None
+    # Options the config left out share the average of the ones it gave
+    row[np.isnan(row)] = np.nanmean(row)
+    if row.sum() <= 0:
+        return None
+    return row / row.sum()
+
+
+def _split_category(value: Any):
+    # Categories are either a bare composition weight or {"weight": w, "responses": {...}}
+    if isinstance(value, numbers.Number):
+        return float(value), None
+    if isinstance(value, dict):
+        weight = value.get('weight')
+        responses = value.get('responses')
+        if responses is None and 'weight' not in value:
+            responses = value
+        return (float(weight) if isinstance(weight, numbers.Number) else None), responses
+    return None, None
+
+
+def compile_question_config(question_config: Dict[str, Any], question: Dict[str, Any]) -> CompiledQuestionConfig:
+    labels, texts = question_options(question)
+    num_options = len(texts)
+    option_index = _option_index(labels, texts)
+    uniform = np.log(np.full(num_options, 1.0 / max(num_options, 1)))
+
+    variables, tables, composition = [], [], {}
+    for variable, categories in (question_config or {}).items():
+        if variable not in DEMOGRAPHIC_VARIABLES or not isinstance(categories, dict):
+            logger.warning(f"Ignoring unknown demographic variable in question config: {variable}")
+            continue
+        known = DEMOGRAPHIC_VARIABLES[variable]
+        table = np.tile(uniform, (len(known) + 1, 1))
+        weights = np.zeros(len(known))
+        conditioned = False
+        for category, value in categories.items():
+            if category not in known:
+                logger.warning(f"Ignoring unknown category {category} for {variable}")
+                continue
+            position = known.index(category)
+            weight, responses = _split_category(value)
+            if weight is not None:
+                weights[position] = weight
+            if isinstance(responses, dict) and num_options:
+                row = _response_row(responses, option_index, num_options)
+                if row is not None:
+                    table[position] = np.log(np.maximum(row, MIN_PROBABILITY))
+                    conditioned = True
+        if weights.sum() > 0:
+            composition[variable] = weights / weights.sum()
+        if conditioned:
+            variables.append(variable)
+            tables.append(table)
+
+    logger.info(f"Compiled question config: conditioning on {variables}, composition for {list(composition)}")
+    return CompiledQuestionConfig(variables, tables, composition, num_options)
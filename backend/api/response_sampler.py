@@ -0,0 +1,85 @@
+import logging
+from typing import Any, Dict, List, Tuple
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def question_options(question: Dict[str, Any]) -> Tuple[List[str], List[str]]:
+    # Returns parallel (labels, texts); list-style options use the text as the label
+    options = question.get('options', {})
+    if isinstance(options, dict):
+        return [str(k) for k in options.keys()], [str(v) for v in options.values()]
+    if isinstance(options, list):
+        return [str(o) for o in options], [str(o) for o in options]
+    logger.error(f"Unexpected options type: {type(options)}")
+    return [], []
+
+
+def uniform_probabilities(num_respondents: int, num_options: int) -> np.ndarray:
+    return np.full((num_respondents, num_options), 1.0 / num_options)
+
+
+def sample_choices(probabilities: np.ndarray, rng=None) -> np.ndarray:
+    """Draw one option code per respondent from a respondent-by-option matrix.
+
+    Rows need not be normalized. All draws happen in a single inverse-CDF pass.
+    """
+    if rng is None:
+        rng = np.random
+    probabilities = np.asarray(probabilities, dtype=np.float64)
+    num_respondents, num_options = probabilities.shape
+    cdf = np.cumsum(probabilities, axis=1)
+    draws = rng.random(num_respondents) * cdf[:, -1]
+    codes = (cdf <= draws[:, None]).sum(axis=1)
+    # Guards against floating point draws landing exactly on the last edge
+    np.minimum(codes, num_options - 1, out=codes)
+    return codes.astype(np.int16 if num_options < 2 ** 15 else np.int32)
+
+
+def weighted_counts(codes: np.ndarray, weights: np.ndarray, num_options: int) -> np.ndarray:
+    return np.bincount(codes, weights=weights, minlength=num_options)
+
+
+class ResponseReservoir:
+    """Fixed-size uniform sample of (row, code, weight) over a stream of blocks.
+
+    Vectorized Algorithm R: each incoming item with global position i replaces a
+    random slot with probability size / (i + 1).
+    """
+
+    def __init__(self, size: int):
+        self.size = size
+        self.seen = 0
+        self.rows = np.empty(size, dtype=np.int64)
+        self.codes = np.empty(size, dtype=np.int32)
+        self.weights = np.empty(size, dtype=np.float64)
+
+    def update(self, rows: np.ndarray, codes: np.ndarray, weights: np.ndarray, rng=None):
+        if rng is None:
+            rng = np.random
+        if self.size == 0:
+            self.seen += len(rows)
+            return
+        # Fill the empty slots first
+        filled = min(self.seen, self.size)
+        take = min(self.size - filled, len(rows))
+        self.rows[filled:filled + take] = rows[:take]
+        self.codes[filled:filled + take] = codes[:take]
+        self.weights[filled:filled + take] = weights[:take]
+        self.seen += take
+
+        rest = len(rows) - take
+        if rest:
+            positions = self.seen + np.arange(rest)
+            slots = (rng.random(rest) * (positions + 1)).astype(np.int64)
+            accepted = np.flatnonzero(slots < self.size)
+            # With repeated slots the later item wins, matching the sequential algorithm
+            self.rows[slots[accepted]] = rows[take:][accepted]
+            self.codes[slots[accepted]] = codes[take:][accepted]
+            self.weights[slots[accepted]] = weights[take:][accepted]
+            self.seen += rest
+
+    def items(self):
+        count = min(self.seen, self.size)
+        return self.rows[:count], self.codes[:count], self.weights[:count]
@@ -1,9 +1,19 @@
-from flask import Blueprint, jsonify, request, session, render_template, current_app
-from . import create_survey, conduct_survey, create_survey_analysis, create_question_config
+from flask import Blueprint, jsonify, request, session, render_template, current_app, Response, stream_with_context, url_for
+from . import create_survey, conduct_survey, create_survey_analysis, create_question_config, approval_pipeline, jobs
 from .config import Config
 import logging
+import json
+import time
 from .models import SurveyData
 from . import db
+from .profile_store import get_profile_store
+from .packed_responses import rehydrate_responses, is_packed, unpack_rows
+from .crosstabs import weighted_crosstabs
+from .seeding import parse_seed
+from .llm_metrics import llm_metrics
+from .unit_of_work import write_stats
+from .survey_data_cache import survey_data_cache
+from .survey_codec import decode
 from .session_management import get_user_and_session_ids, update_session_activity, generate_new_session_id, get_or_create_user_id
 from flask import send_file
 import sqlite3
@@ -11,6 +21,7 @@ import csv
 import io
 import zipfile
 import os
+import hmac
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s: %(message)s')
 logger = logging.getLogger('voxbox')
@@ -62,6 +73,7 @@ def transform_question_route():
         logger.info("Calling process_and_save_question function")
         transformed_question = create_survey.process_and_save_question(user_id, session_id, user_question)
         logger.info(f"Transformed question: {transformed_question}")
+        create_question_config.start_speculative_config(current_app._get_current_object(), user_id, session_id, transformed_question)
         return jsonify({
             "original_question": user_question,
             "transformed_question": transformed_question
@@ -70,6 +82,35 @@ def transform_question_route():
         logger.error(f"Error in transform_question_route: {str(e)}", exc_info=True)
         return jsonify({"error": "Failed to transform question"}), 500
 
+@main.route('/transform-questions', methods=['POST'])
+def transform_questions_route():
+    # Runs as a background job: one 'item' progress event per question as it finishes (in completion order),
+    # and a summary with every result in input order as the job result
+    questions = (request.get_json(silent=True) or {}).get('questions')
+    if not isinstance(questions, list) or not questions:
+        return jsonify({"error": "No questions provided"}), 400
+    if len(questions) > Config.TRANSFORM_BATCH_MAX:
+        return jsonify({"error": f"At most {Config.TRANSFORM_BATCH_MAX} questions per batch"}), 400
+    user_id, session_id = get_user_and_session_ids()
+    app = current_app._get_current_object()
+    logger.info(f"Transforming a batch of {len(questions)} questions")
+
+    def run_batch(report):
+        started = time.monotonic()
+        results = []
+        for result in create_survey.transform_questions(app, questions):
+            report('item', **result)
+            results.append(result)
+        succeeded = [result for result in results if 'error' not in result]
+        return {"count": len(questions), "succeeded": len(succeeded), "failed": len(results) - len(succeeded),
+                "cached": sum(result['cached'] for result in succeeded),
+                "elapsed": round(time.monotonic() - started, 3),
+                "rate_limit": create_survey.transform_limiter.stats(),
+                "results": sorted(results, key=lambda result: result['index'])}
+
+    job_id = jobs.enqueue_job(app, user_id, session_id, 'transform_questions', run_batch)
+    return jsonify(job_links(job_id)), 202
+
 @main.route('/approve-question', methods=['POST'])
 def approve_question_route():
     logger.info("Entered approve_question_route")
@@ -88,32 +129,28 @@ def approve_question_route():
             return jsonify({"error": "No question found in database. Please submit a question first."}), 400
 
         if approved:
-            create_question_config.main(user_id, session_id)
-            question_config = SurveyData.get_data(session_id, 'question_config', user_id)
-            if not question_config:
-                logger.warning("Failed to generate question config")
-                question_config = {"error": "Failed to generate question config"}
-
-            survey_results = conduct_survey.conduct_single_question_survey(user_id, session_id)
-            SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='survey_results', content=survey_results)
-            logger.info(f"Saved survey results to database for user {user_id}, session {session_id}")
-
-            analysis_result = create_survey_analysis.main(user_id, session_id)
-            if not analysis_result:
-                logger.warning("Failed to generate analysis")
-                analysis_result = create_survey_analysis.create_default_analysis()
-
-            logger.info(f"Approved question for user {user_id}, session {session_id}: {transformed_question}")
-            return jsonify({
-                "approved_question": transformed_question,
-                "question_config": question_config,
-                "survey_results": survey_results,
-                "analysis": analysis_result
-            })
+            app = current_app._get_current_object()
+            try:
+                seed = parse_seed(request.json.get('seed'))
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            if request.json.get('sync'):
+                return jsonify(approval_pipeline.run_approval_pipeline(app, user_id, session_id, transformed_question, seed=seed))
+
+            def run_pipeline(report):
+                report('started', stages=['question_config', 'survey_results', 'save_results', 'analysis'])
+                return approval_pipeline.run_approval_pipeline(
+                    app, user_id, session_id, transformed_question, seed=seed,
+                    on_stage_done=lambda stage, seconds: report('stage_done', stage=stage, seconds=round(seconds, 3)),
+                    on_analysis_event=report)
+
+            job_id = jobs.enqueue_job(app, user_id, session_id, 'approve_question', run_pipeline)
+            return jsonify(job_links(job_id)), 202
         else:
             logger.info(f"User {user_id}, session {session_id} did not approve. Re-transforming question...")
             new_transformed_question = create_survey.transform_question(original_question)
             SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='transformed_question', content=new_transformed_question)
+            create_question_config.start_speculative_config(current_app._get_current_object(), user_id, session_id, new_transformed_question)
             return jsonify({
                 "message": "Got it! We're trying again!",
                 "new_transformed_question": new_transformed_question
@@ -123,6 +160,49 @@ def approve_question_route():
         logger.error(f"Error in approve_question_route: {str(e)}", exc_info=True)
         return jsonify({"error": "An unexpected error occurred. Please try again."}), 500
 
+def job_links(job_id):
+    # Polling the status URL is the default; the event stream is only offered when enabled
+    links = {"job_id": job_id, "status_url": url_for('main.job_status', job_id=job_id)}
+    if Config.JOB_EVENTS_SSE:
+        links["events_url"] = url_for('main.job_events', job_id=job_id)
+    return links
+
+@main.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    # ?after=N skips the first N progress events, so pollers only fetch what is new
+    user_id = get_or_create_user_id()
+    job = jobs.get_job(job_id, user_id)
+    if job is None:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict(after=request.args.get('after', 0, type=int)))
+
+@main.route('/jobs/<job_id>/events', methods=['GET'])
+def job_events(job_id):
+    if not Config.JOB_EVENTS_SSE:
+        return jsonify({"error": "Job event streams are disabled; poll the job status instead"}), 404
+    user_id = get_or_create_user_id()
+    if jobs.get_job(job_id, user_id) is None:
+        return jsonify({"error": "Job not found"}), 404
+
+    def stream():
+        # Job state lives in the database, so any worker can serve the stream
+        sent = 0
+        deadline = time.monotonic() + Config.JOB_EVENTS_TIMEOUT
+        while time.monotonic() < deadline:
+            job = jobs.get_job(job_id, user_id)
+            events = job.events(after=sent)
+            for event in events:
+                yield f"event: progress\ndata: {json.dumps(event)}\n\n"
+            sent += len(events)
+            if job.status in jobs.FINISHED_STATUSES:
+                yield f"event: done\ndata: {json.dumps(job.to_dict())}\n\n"
+                return
+            time.sleep(Config.JOB_EVENTS_POLL_INTERVAL)
+        yield "event: timeout\ndata: {}\n\n"
+
+    return Response(stream_with_context(stream()), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
 @main.route('/conduct-survey', methods=['POST'])
 def run_survey():
     logger.info("Entered run_survey route")
@@ -130,7 +210,12 @@ def run_survey():
         user_id, session_id = get_user_and_session_ids()
         update_session_activity()
         logger.info(f"[run_survey] User ID: {user_id}, Session ID: {session_id}")
-        result = conduct_survey.conduct_single_question_survey(user_id, session_id)
+        # Passing back a recorded seed replays that run exactly
+        try:
+            seed = parse_seed((request.get_json(silent=True) or {}).get('seed'))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        result = conduct_survey.conduct_single_question_survey(user_id, session_id, seed=seed)
         SurveyData.save_data(user_id=user_id, session_id=session_id, data_type='survey_results', content=result)
         logger.info(f"Survey conducted successfully. Results saved to database for user {user_id}, session {session_id}")
         return jsonify({"result": result})
@@ -138,6 +223,47 @@ def run_survey():
         logger.error(f"Error conducting survey: {str(e)}", exc_info=True)
         return jsonify({"error": "Failed to conduct survey"}), 500
 
+@main.route('/survey-responses', methods=['GET'])
+def survey_responses():
+    logger.info("Entered survey_responses route")
+    try:
+        user_id, session_id = get_user_and_session_ids()
+        results = SurveyData.get_data(session_id, 'survey_results', user_id)
+        if not results:
+            return jsonify({"error": "No survey results found for this session"}), 404
+        include_demographics = request.args.get('demographics', 'false').lower() in ('1', 'true', 'yes')
+        store = get_profile_store() if include_demographics else None
+        responses = rehydrate_responses(results['individual_responses'], store, include_demographics)
+        return jsonify({"individual_responses": responses})
+    except Exception as e:
+        logger.error(f"Error in survey_responses: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to load survey responses"}), 500
+
+@main.route('/survey-crosstabs', methods=['GET'])
+def survey_crosstabs():
+    logger.info("Entered survey_crosstabs route")
+    try:
+        user_id, session_id = get_user_and_session_ids()
+        results = SurveyData.get_data(session_id, 'survey_results', user_id)
+        if not results:
+            return jsonify({"error": "No survey results found for this session"}), 404
+        crosstabs = results.get('crosstabs')
+        if crosstabs is None:
+            # Results saved before crosstabs existed; recompute from the packed responses
+            if not is_packed(results['individual_responses']):
+                return jsonify({"error": "Crosstabs are not available for these results"}), 404
+            packed = results['individual_responses']
+            store = get_profile_store()
+            rows, codes, weights = unpack_rows(packed, store)
+            crosstabs = weighted_crosstabs(store, rows, codes, weights.astype(float), packed['options'])
+        return jsonify({
+            "question": results['aggregate_results']['question'],
+            "crosstabs": crosstabs
+        })
+    except Exception as e:
+        logger.error(f"Error in survey_crosstabs: {str(e)}", exc_info=True)
+        return jsonify({"error": "Failed to compute crosstabs"}), 500
+
 @main.route('/create-analysis', methods=['POST'])
 def create_analysis_route():
     logger.info("Entered create_analysis_route")
@@ -152,6 +278,46 @@ def create_analysis_route():
         logger.error(f"Error in create_analysis_route: {str(e)}", exc_info=True)
         return jsonify({"error": str(e)}), 500
 
+@main.route('/cache-stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "question_transform": create_survey.transform_cache.stats(),
+        "question_config": create_question_config.config_cache.stats()
+    })
+
+@main.route('/db-stats', methods=['GET'])
+def db_stats():
+    return jsonify({"unit_of_work": Config.SURVEY_DATA_UNIT_OF_WORK, "writes": write_stats.snapshot(),
+                    "read_cache": survey_data_cache.stats()})
+
+@main.route('/llm-metrics', methods=['GET'])
+def get_llm_metrics():
+    # Per-stage token use, latency and prompt savings since the process started
+    return jsonify({"prompt_compaction": Config.PROMPT_COMPACTION, "stages": llm_metrics.snapshot()})
+
+@main.route('/question-config-cache/invalidate', methods=['POST'])
+def invalidate_question_config_cache():
+    # Drops the cached config for this session's question; {"all": true} with the admin token clears every entry
+    user_id, session_id = get_user_and_session_ids()
+    update_session_activity()
+    body = request.get_json(silent=True) or {}
+    if body.get('all') is True:
+        token = Config.CONFIG_CACHE_ADMIN_TOKEN
+        if not token or not hmac.compare_digest(request.headers.get('X-Admin-Token', ''), token):
+            return jsonify({"error": "Clearing every cached config requires the admin token"}), 403
+        question = None
+    else:
+        question = SurveyData.get_data(session_id, 'transformed_question', user_id)
+        if not question:
+            return jsonify({"error": "No question found for this session"}), 400
+        requested = body.get('question')
+        if requested is not None and (not isinstance(requested, dict) or
+                                      create_question_config.question_fingerprint(requested) !=
+                                      create_question_config.question_fingerprint(question)):
+            return jsonify({"error": "Only this session's question can be invalidated"}), 403
+    removed = create_question_config.invalidate_cached_config(question)
+    return jsonify({"invalidated": removed, "schema_version": create_question_config.SCHEMA_VERSION})
+
 @main.route('/init-db')
 def init_db():
     db.create_all()
@@ -178,17 +344,32 @@ def export_data():
     cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
     tables = cursor.fetchall()
 
+    # Payloads are stored encoded (MessagePack, possibly compressed) in content_blob, so they are exported decoded, as JSON
+    decoded_queries = {
+        'survey_data': ("SELECT s.id, s.user_id, s.session_id, s.data_type, s.timestamp, s.blob_hash, b.codec, "
+                        "COALESCE(b.data, b.content, s.content) FROM survey_data s "
+                        "LEFT JOIN content_blob b ON b.hash = s.blob_hash ORDER BY s.id"),
+        'content_blob': "SELECT hash, size, refcount, created_at, codec, COALESCE(data, content) FROM content_blob"
+    }
+
     memory_file = io.BytesIO()
     with zipfile.ZipFile(memory_file, 'w') as zf:
         for table in tables:
             table_name = table[0]
-            cursor.execute(f"SELECT * FROM {table_name}")
-            rows = cursor.fetchall()
+            if table_name in decoded_queries:
+                cursor.execute(decoded_queries[table_name])
+                header = [description[0] for description in cursor.description][:-2] + ['content']
+                rows = [row[:-2] + (json.dumps(decode(row[-2], row[-1])) if row[-1] is not None else None,)
+                        for row in cursor.fetchall()]
+            else:
+                cursor.execute(f"SELECT * FROM {table_name}")
+                header = [description[0] for description in cursor.description]
+                rows = cursor.fetchall()
 
             output = io.StringIO()
             writer = csv.writer(output)
             
-            writer.writerow([description[0] for description in cursor.description])
+            writer.writerow(header)
             writer.writerows(rows)
 
             zf.writestr(f"{table_name}.csv", output.getvalue())
@@ -0,0 +1,38 @@
+import secrets
+from typing import Any, List, Optional
+import numpy as np
+
+# Substream slots spawned from a run's seed; the order must stay fixed so old seeds replay
+SAMPLE_STREAM, RESPONSE_STREAM, BOOTSTRAP_STREAM = range(3)
+
+
+# 53 bits keeps the seed exact as a JavaScript number, so a seed the browser sends back replays the same run
+SEED_BITS = 53
+
+
+def new_run_seed() -> int:
+    return secrets.randbits(SEED_BITS)
+
+
+def parse_seed(value: Any) -> Optional[int]:
+    # A client-supplied seed: None, or a non-negative integer (or its decimal string) below 2**SEED_BITS
+    if value is None:
+        return None
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if not isinstance(value, int) or isinstance(value, bool) or not 0 <= value < 2 ** SEED_BITS:
+        raise ValueError(f"seed must be an integer from 0 to 2**{SEED_BITS} - 1")
+    return value
+
+
+def run_streams(seed: int, count: int = 3) -> List[np.random.SeedSequence]:
+    return np.random.SeedSequence(seed).spawn(count)
+
+
+def generator(seed_sequence: np.random.SeedSequence) -> np.random.Generator:
+    return np.random.Generator(np.random.PCG64(seed_sequence))
+
+
+def chunk_generators(seed_sequence: np.random.SeedSequence, num_chunks: int) -> List[np.random.Generator]:
+    # Independent per-chunk substreams: results do not depend on the order chunks run in
+    return [generator(child) for child in seed_sequence.spawn(num_chunks)]
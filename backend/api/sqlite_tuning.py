@@ -0,0 +1,44 @@
+import logging
+from sqlalchemy import event
+from .config import Config
+
+logger = logging.getLogger('voxbox')
+
+
+def is_sqlite_file(uri):
+    # In-memory databases use a static pool and gain nothing from WAL
+    uri = str(uri)
+    return uri.startswith('sqlite') and uri.rstrip('/') not in ('sqlite:', 'sqlite:///:memory:') and 'memory' not in uri
+
+
+def engine_options():
+    # Enough pooled connections for the job, pipeline, speculation and batch threads of one worker;
+    # the driver-level timeout matches the busy_timeout pragma
+    return {
+        'pool_size': Config.SQLITE_POOL_SIZE,
+        'max_overflow': Config.SQLITE_MAX_OVERFLOW,
+        'pool_timeout': Config.SQLITE_POOL_TIMEOUT,
+        'connect_args': {'timeout': Config.SQLITE_BUSY_TIMEOUT_MS / 1000, 'check_same_thread': False}
+    }
+
+
+def install_pragmas(engine):
+    """Tune every new SQLite connection of ``engine`` for concurrent workers.
+
+    WAL lets readers run alongside the single writer, busy_timeout makes a
+    writer wait for the lock instead of failing with "database is locked",
+    and synchronous=NORMAL is durable under WAL except across power loss.
+    """
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA journal_mode={Config.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA synchronous={Config.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA cache_size=-{Config.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={Config.SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.close()
+
+    logger.info(f"Managed SQLite: journal_mode={Config.SQLITE_JOURNAL_MODE}, synchronous={Config.SQLITE_SYNCHRONOUS}, "
+                f"busy_timeout={Config.SQLITE_BUSY_TIMEOUT_MS}ms")
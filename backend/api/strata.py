@@ -0,0 +1,149 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from .config import Config
+from .profile_store import ProfileStore
+
+logger = logging.getLogger(__name__)
+
+# Least recently used indexes go first; question_config quotas vary the variable set per question
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+class StrataIndex:
+    """Profile row IDs grouped by every combination of demographic categories.
+
+    Cells are numbered in mixed radix over ``variables``. Rows are stored sorted
+    by cell (CSR layout), so ``offsets[c]:offsets[c + 1]`` slices out the rows
+    of cell ``c``. Profiles with a value outside the category lists are not in
+    any cell.
+    """
+
+    def __init__(self, store: ProfileStore, variables: Sequence[str], categories: Dict[str, List[str]]):
+        self.variables = list(variables)
+        self.categories = {v: list(categories[v]) for v in self.variables}
+        self.shape = tuple(len(self.categories[v]) for v in self.variables)
+        self.num_cells = int(np.prod(self.shape)) if self.shape else 1
+
+        cells = np.zeros(len(store), dtype=np.int64)
+        valid = np.ones(len(store), dtype=bool)
+        for variable, size in zip(self.variables, self.shape):
+            codes = store.encode(variable, self.categories[variable])
+            valid &= codes >= 0
+            cells = cells * size + codes
+        valid_rows = np.flatnonzero(valid)
+        order = np.argsort(cells[valid_rows], kind='stable')
+        self.rows = valid_rows[order]
+        self.counts = np.bincount(cells[valid_rows], minlength=self.num_cells)
+        self.offsets = np.concatenate(([0], np.cumsum(self.counts)))
+        logger.info(f"Strata index built over {self.variables}: {self.num_cells} cells, "
+                    f"{int((self.counts > 0).sum())} populated, {len(self.rows)} profiles")
+
+    def cell_rows(self, category_indices: Sequence[int]) -> np.ndarray:
+        cell = int(np.ravel_multi_index(tuple(category_indices), self.shape))
+        return self.rows[self.offsets[cell]:self.offsets[cell + 1]]
+
+    def allocate(self, marginals: Dict[str, np.ndarray], num_respondents: int,
+                 tolerance: float = 1e-6, max_iterations: int = 100) -> np.ndarray:
+        """Integer quotas per cell for a sample of ``num_respondents``.
+
+        The joint target is fitted by iterative proportional fitting over the
+        populated cells so each variable matches its marginal; variables without
+        a marginal keep the frame's own distribution. Counts are rounded so they
+        sum exactly to ``num_respondents``; when the populated cells can meet the
+        marginals, every category of every variable then lands within one
+        respondent of its expected count.
+        """
+        counts = self.counts.reshape(self.shape)
+        targets = []
+        for axis, variable in enumerate(self.variables):
+            marginal = marginals.get(variable)
+            if marginal is None:
+                marginal = counts.sum(axis=tuple(a for a in range(len(self.shape)) if a != axis))
+            marginal = np.asarray(marginal, dtype=np.float64)
+            targets.append(marginal / marginal.sum() if marginal.sum() > 0 else marginal)
+
+        # Fit the joint over populated cells to the marginals, as the raking engine does for weights
+        joint = (counts > 0).astype(np.float64)
+        if joint.sum() <= 0:
+            raise ValueError("Quota targets do not overlap any populated stratum")
+        for _ in range(max_iterations):
+            max_error = 0.0
+            for axis, target in enumerate(targets):
+                other = tuple(a for a in range(len(self.shape)) if a != axis)
+                current = joint.sum(axis=other)
+                current_share = current / current.sum()
+                max_error = max(max_error, np.abs(current_share - target).max())
+                factors = np.divide(target, current_share, out=np.zeros_like(current), where=current > 0)
+                shape = [1] * len(self.shape)
+                shape[axis] = self.shape[axis]
+                joint = joint * factors.reshape(shape)
+            if max_error < tolerance:
+                break
+        joint = joint.ravel()
+        if joint.sum() <= 0:
+            raise ValueError("Quota targets do not overlap any populated stratum")
+        expected = joint / joint.sum() * num_respondents
+        return self._round(expected, np.flatnonzero(joint > 0), num_respondents)
+
+    def _round(self, expected: np.ndarray, populated: np.ndarray, num_respondents: int) -> np.ndarray:
+        # Rounding the cells on their own remainders loses the marginals once most cells expect less than
+        # one respondent: the leftover respondents all go to the largest cells. Instead each one goes to the
+        # populated cell whose categories are furthest below their expected marginal counts, preferring the
+        # cell whose worst-off variable is furthest below, then the total shortfall, then its own remainder
+        quotas = np.floor(expected).astype(np.int64)
+        shortfall = num_respondents - int(quotas.sum())
+        if not shortfall:
+            return quotas
+        if not self.variables:
+            quotas[populated] += shortfall
+            return quotas
+        remainders = expected - quotas
+        codes = [c[populated] for c in np.unravel_index(np.arange(self.num_cells), self.shape)]
+        deficits = [np.bincount(c, weights=remainders[populated], minlength=size)
+                    for c, size in zip(codes, self.shape)]
+        remainders = remainders[populated]
+        for _ in range(shortfall):
+            per_variable = np.stack([deficit[c] for deficit, c in zip(deficits, codes)])
+            best = np.lexsort((remainders, per_variable.sum(axis=0), per_variable.min(axis=0)))[-1]
+            quotas[populated[best]] += 1
+            remainders[best] -= 1
+            for deficit, c in zip(deficits, codes):
+                deficit[c[best]] -= 1
+        return quotas
+
+    def sample(self, quotas: np.ndarray, rng=None) -> np.ndarray:
+        # One uniform draw per respondent, mapped into its cell's slice of rows
+        if rng is None:
+            rng = np.random
+        cells = np.repeat(np.arange(self.num_cells), quotas)
+        positions = (rng.random(len(cells)) * self.counts[cells]).astype(np.int64)
+        return self.rows[self.offsets[cells] + positions]
+
+
+def get_strata_index(store: ProfileStore, variables: Sequence[str], categories: Dict[str, List[str]]) -> StrataIndex:
+    key = (store.version, tuple(variables), tuple(tuple(categories[v]) for v in variables))
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is not None:
+            _indexes.move_to_end(key)
+            return index
+        index = StrataIndex(store, variables, categories)
+        _indexes[key] = index
+        while len(_indexes) > Config.STRATA_INDEX_CACHE_SIZE:
+            _indexes.popitem(last=False)
+    return index
+
+
+def quota_sample(store: ProfileStore, num_respondents: int, targets: Dict[str, Dict[str, float]],
+                 variables: Optional[Sequence[str]] = None, rng=None) -> np.ndarray:
+    # targets maps variable -> {category: proportion}, e.g. census targets or a question_config composition
+    variables = [v for v in (variables or targets) if v in targets]
+    categories = {v: list(targets[v]) for v in variables}
+    index = get_strata_index(store, variables, categories)
+    marginals = {v: np.array([targets[v][c] for c in categories[v]], dtype=np.float64) for v in variables}
+    quotas = index.allocate(marginals, num_respondents)
+    return index.sample(quotas, rng)
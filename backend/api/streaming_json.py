@@ -0,0 +1,133 @@
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class IncrementalJSONParser:
+    """Emits the members of a streamed JSON object as each one completes.
+
+    Text is fed in arbitrary chunks. Every top-level member produces
+    ``('field', key, value)`` once its value closes. Members named in
+    ``item_keys`` whose value is an array also produce
+    ``('item', key, index, value)`` for each element, scalars included, as
+    soon as that element closes. Anything before the opening brace, such as a code fence, is skipped.
+    Fragments that do not parse are dropped here; the caller still parses the
+    full text at the end.
+    """
+
+    def __init__(self, item_keys=()):
+        self.item_keys = set(item_keys)
+        self.text = ''
+        self.pos = 0
+        self.depth = 0
+        self.started = False
+        self.finished = False
+        self.in_string = False
+        self.escaped = False
+        self.string_start = None
+        self.key = None
+        self.expect_value = False
+        self.value_start = None
+        self.in_item_array = False
+        self.item_start = None
+        self.item_index = 0
+
+    def _load(self, fragment):
+        try:
+            return True, json.loads(fragment)
+        except ValueError:
+            logger.debug(f"Skipping unparseable streamed fragment: {fragment[:80]}")
+            return False, None
+
+    def _close_value(self, end, events):
+        ok, value = self._load(self.text[self.value_start:end].strip())
+        if ok:
+            events.append(('field', self.key, value))
+        self.expect_value = False
+        self.value_start = None
+        self.in_item_array = False
+
+    def _close_item(self, end, events):
+        ok, value = self._load(self.text[self.item_start:end])
+        if ok:
+            events.append(('item', self.key, self.item_index, value))
+        self.item_index += 1
+        self.item_start = None
+
+    def feed(self, chunk):
+        self.text += chunk
+        events = []
+        text = self.text
+        for i in range(self.pos, len(text)):
+            if self.finished:
+                break
+            c = text[i]
+            if not self.started:
+                if c == '{':
+                    self.started = True
+                    self.depth = 1
+                continue
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif c == '\\':
+                    self.escaped = True
+                elif c == '"':
+                    self.in_string = False
+                    if self.depth == 1 and not self.expect_value:
+                        ok, key = self._load(text[self.string_start:i + 1])
+                        self.key = key if ok else None
+                    elif self.depth == 1 and self.value_start == self.string_start:
+                        self._close_value(i + 1, events)
+                    elif self.depth == 2 and self.in_item_array and self.item_start == self.string_start:
+                        self._close_item(i + 1, events)
+                continue
+
+            if c == '"':
+                self.in_string = True
+                self.string_start = i
+                if self.depth == 1 and self.expect_value and self.value_start is None:
+                    self.value_start = i
+                elif self.depth == 2 and self.in_item_array and self.item_start is None:
+                    self.item_start = i
+            elif c in '{[':
+                if self.depth == 1 and self.expect_value:
+                    self.value_start = i
+                    self.in_item_array = c == '[' and self.key in self.item_keys
+                    self.item_index = 0
+                elif self.depth == 2 and self.in_item_array and self.item_start is None:
+                    self.item_start = i
+                self.depth += 1
+            elif c in '}]':
+                self.depth -= 1
+                if self.depth == 1 and self.in_item_array and self.item_start is not None:
+                    self._close_item(i, events)
+                if self.depth == 2 and self.in_item_array and self.item_start is not None:
+                    self._close_item(i + 1, events)
+                elif self.depth == 1 and self.expect_value and self.value_start is not None:
+                    self._close_value(i + 1, events)
+                elif self.depth == 0:
+                    # A number or literal as the last member ends at the closing brace
+                    if self.expect_value and self.value_start is not None:
+                        self._close_value(i, events)
+                    self.finished = True
+            elif self.depth == 2 and self.in_item_array:
+                # Numbers and literals in an item array end at the next comma or at the closing bracket
+                if c == ',':
+                    if self.item_start is not None:
+                        self._close_item(i, events)
+                elif self.item_start is None and not c.isspace():
+                    self.item_start = i
+            elif self.depth == 1:
+                if c == ':':
+                    self.expect_value = True
+                    self.value_start = None
+                elif c == ',':
+                    if self.expect_value and self.value_start is not None:
+                        self._close_value(i, events)
+                elif self.expect_value and self.value_start is None and not c.isspace():
+                    self.value_start = i
+        self.pos = len(text)
+        return events
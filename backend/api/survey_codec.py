@@ -0,0 +1,47 @@
+import json
+import zlib
+import msgspec
+from .config import Config
+
+# Codec tags stored alongside each payload. 'json' also covers rows written as text before this module
+# existed; a '+zlib' suffix marks a payload compressed after encoding.
+JSON = 'json'
+MSGPACK = 'msgpack'
+COMPRESSED_SUFFIX = '+zlib'
+CODECS = (JSON, MSGPACK)
+
+
+def encode(value, codec=None, compress_threshold=None):
+    """Encode ``value`` for storage, returning ``(codec_tag, data)``.
+
+    Payloads whose encoded size reaches ``compress_threshold`` bytes are
+    zlib-compressed and tagged accordingly; a threshold of 0 disables
+    compression. Encoding is deterministic, so equal values give equal bytes.
+    """
+    codec = codec or Config.SURVEY_DATA_CODEC
+    if compress_threshold is None:
+        compress_threshold = Config.SURVEY_DATA_COMPRESS_THRESHOLD
+    if codec == MSGPACK:
+        data = msgspec.msgpack.encode(value)
+    elif codec == JSON:
+        data = msgspec.json.encode(value)
+    else:
+        raise ValueError(f"Unknown SurveyData codec {codec!r}, expected one of {CODECS}")
+    if compress_threshold and len(data) >= compress_threshold:
+        return codec + COMPRESSED_SUFFIX, zlib.compress(data, Config.SURVEY_DATA_COMPRESS_LEVEL)
+    return codec, data
+
+
+def decode(codec, data):
+    if isinstance(data, str):
+        # Text written by json.dumps, which may hold NaN or Infinity that msgspec rejects
+        return json.loads(data)
+    codec = codec or JSON
+    if codec.endswith(COMPRESSED_SUFFIX):
+        codec = codec[:-len(COMPRESSED_SUFFIX)]
+        data = zlib.decompress(data)
+    if codec == MSGPACK:
+        return msgspec.msgpack.decode(data)
+    if codec == JSON:
+        return msgspec.json.decode(data)
+    raise ValueError(f"Unknown SurveyData codec {codec!r}")
@@ -0,0 +1,122 @@
+import time
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from flask import g, has_app_context
+from .config import Config
+from .survey_codec import decode
+
+
+class SurveyDataCache:
+    """Bounded LRU of decoded SurveyData payloads shared by every request in the process.
+
+    Keyed by (session_id, data_type, user_id). Writes made through
+    ``SurveyData.save_data`` replace the entry once committed, so this process
+    never reads its own stale data, but a write made by another process can go
+    unseen until the TTL expires. That is why it is off unless
+    SURVEY_DATA_CACHE_SIZE is set, which is only safe with a single worker.
+    Cached payloads are shared, so callers must treat what ``get_data``
+    returns as read-only.
+    """
+
+    def __init__(self, max_entries, ttl_seconds):
+        self.max_entries = max_entries
+        self.ttl = ttl_seconds
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        if not self.enabled:
+            return None
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self.entries.pop(key, None)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self.lock:
+            self.entries[key] = (time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self.entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+survey_data_cache = SurveyDataCache(Config.SURVEY_DATA_CACHE_SIZE, Config.SURVEY_DATA_CACHE_TTL)
+
+
+_local = threading.local()
+
+
+def request_identity_map():
+    # One decoded payload per key for the life of the current app context (a request, a job), or of the
+    # run a pipeline worker is serving
+    shared = getattr(_local, 'identity_map', None)
+    if shared is not None:
+        return shared
+    if not has_app_context():
+        return None
+    return g.setdefault('survey_data_identity_map', {})
+
+
+@contextmanager
+def share_identity_map(identity_map):
+    # Makes this thread read through ``identity_map``, e.g. a pipeline stage using its caller's map
+    previous = getattr(_local, 'identity_map', None)
+    _local.identity_map = identity_map
+    try:
+        yield identity_map
+    finally:
+        _local.identity_map = previous
+
+
+def remember_read(key, value):
+    identity_map = request_identity_map()
+    if identity_map is not None:
+        identity_map[key] = value
+    survey_data_cache.put(key, value)
+
+
+def lookup(key):
+    identity_map = request_identity_map()
+    if identity_map is not None and key in identity_map:
+        return identity_map[key]
+    value = survey_data_cache.get(key)
+    if value is not None and identity_map is not None:
+        identity_map[key] = value
+    return value
+
+
+def remember_write(user_id, session_id, data_type, codec, data):
+    # A committed write is now the newest row for its user and for the session as a whole
+    value = decode(codec, data)
+    remember_read((session_id, data_type, user_id), value)
+    if user_id is not None:
+        remember_read((session_id, data_type, None), value)
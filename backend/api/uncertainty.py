@@ -0,0 +1,51 @@
+import logging
+from typing import Any, Dict
+import numpy as np
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+
+def design_effect(sum_weights: float, sum_squared_weights: float, num_respondents: int) -> float:
+    # Kish's approximation: 1 for uniform weights, growing with weight variance
+    if sum_weights <= 0:
+        return 1.0
+    return float(num_respondents * sum_squared_weights / sum_weights ** 2)
+
+
+def multinomial_intervals(shares: np.ndarray, effective_n: float, replicates: int, confidence: float, rng=None):
+    """Percentile intervals for answer shares from multinomial replicates.
+
+    All replicates are drawn as one (replicates x options) array at the
+    effective sample size, so the cost depends on the number of options and
+    not on the number of respondents.
+    """
+    if rng is None:
+        rng = np.random
+    trials = max(int(round(effective_n)), 1)
+    draws = rng.multinomial(trials, shares, size=replicates) / trials
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(draws, [alpha, 1 - alpha], axis=0)
+    return low, high
+
+
+def add_margins_of_error(result: Dict[str, Any], weighted_responses: np.ndarray, num_respondents: int,
+                         sum_weights: float, sum_squared_weights: float, rng=None) -> Dict[str, Any]:
+    total = weighted_responses.sum()
+    if total <= 0 or num_respondents <= 0:
+        return result
+    shares = weighted_responses / total
+    shares = shares / shares.sum()
+    deff = design_effect(sum_weights, sum_squared_weights, num_respondents)
+    effective_n = num_respondents / deff
+    confidence = Config.CONFIDENCE_LEVEL
+    low, high = multinomial_intervals(shares, effective_n, Config.BOOTSTRAP_REPLICATES, confidence, rng)
+
+    for answer, lo, hi in zip(result['answers'], low, high):
+        answer['ci_low'] = float(lo * 100)
+        answer['ci_high'] = float(hi * 100)
+        answer['margin_of_error'] = float((hi - lo) * 100 / 2)
+    result['confidence_level'] = confidence
+    result['design_effect'] = deff
+    result['effective_sample_size'] = effective_n
+    return result
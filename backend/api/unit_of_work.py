@@ -0,0 +1,134 @@
+import threading
+import logging
+from contextlib import contextmanager
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from . import db
+from .survey_data_cache import remember_write
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+class WriteStats:
+    # Process-wide commit counters: every session commit, and how SurveyData rows reached the database
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.session_commits = 0
+        self.immediate_commits = 0
+        self.unit_of_work_commits = 0
+        self.rows_written = 0
+        self.rows_coalesced = 0
+
+    def record(self, **counts):
+        with self.lock:
+            for name, value in counts.items():
+                setattr(self, name, getattr(self, name) + value)
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'session_commits': self.session_commits,
+                'survey_data_immediate_commits': self.immediate_commits,
+                'survey_data_unit_of_work_commits': self.unit_of_work_commits,
+                'survey_data_rows_written': self.rows_written,
+                'survey_data_rows_coalesced': self.rows_coalesced
+            }
+
+
+write_stats = WriteStats()
+
+
+@event.listens_for(Session, 'after_commit')
+def _count_commit(session):
+    write_stats.record(session_commits=1)
+
+
+class UnitOfWork:
+    """Collects SurveyData writes and flushes them in one transaction.
+
+    Rows are kept as plain dicts in write order, from whichever thread adds
+    them, and go out as a single bulk insert. Reads through
+    ``SurveyData.get_data`` see pending rows first, so code inside the unit
+    reads its own writes. A write identical to the pending one for the same
+    key is dropped.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.lock = threading.Lock()
+        self.coalesced = 0
+
+    def add(self, row):
+        with self.lock:
+            previous = self._latest(row['session_id'], row['data_type'], row['user_id'])
+            if previous is not None and (previous['codec'], previous['content']) == (row['codec'], row['content']):
+                self.coalesced += 1
+                return
+            self.rows.append(row)
+
+    def _latest(self, session_id, data_type, user_id=None):
+        for row in reversed(self.rows):
+            if row['session_id'] == session_id and row['data_type'] == data_type and (not user_id or row['user_id'] == user_id):
+                return row
+        return None
+
+    def latest(self, session_id, data_type, user_id=None):
+        with self.lock:
+            return self._latest(session_id, data_type, user_id)
+
+    def flush(self):
+        from .models import SurveyData
+        with self.lock:
+            rows, self.rows = self.rows, []
+            coalesced, self.coalesced = self.coalesced, 0
+        if not rows:
+            return 0
+        try:
+            SurveyData.insert_rows(rows)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error flushing {len(rows)} survey data rows: {str(e)}")
+            raise
+        write_stats.record(unit_of_work_commits=1, rows_written=len(rows), rows_coalesced=coalesced)
+        for row in rows:
+            remember_write(row['user_id'], row['session_id'], row['data_type'], row['codec'], row['content'])
+        logger.info(f"Flushed {len(rows)} survey data rows in one transaction ({coalesced} duplicate writes dropped)")
+        return len(rows)
+
+
+def current_unit_of_work():
+    return getattr(_local, 'unit', None)
+
+
+@contextmanager
+def activate(unit):
+    # Makes ``unit`` the current unit of work on this thread, e.g. inside a pipeline worker
+    previous = current_unit_of_work()
+    _local.unit = unit
+    try:
+        yield unit
+    finally:
+        _local.unit = previous
+
+
+@contextmanager
+def unit_of_work():
+    # Whatever was collected is flushed even when the body fails, as separate commits would have been;
+    # a flush failing after that is only logged, so the body's exception is the one that propagates
+    unit = UnitOfWork()
+    with activate(unit):
+        try:
+            yield unit
+        except BaseException:
+            try:
+                unit.flush()
+            except Exception as e:
+                logger.error(f"Could not flush survey data after a failed unit of work: {str(e)}")
+            raise
+        unit.flush()
@@ -0,0 +1,106 @@
+import os
+import csv
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from .config import Config
+from .profile_store import ProfileStore
+
+logger = logging.getLogger(__name__)
+
+_census_targets = None
+_census_lock = threading.Lock()
+
+_weight_cache = OrderedDict()
+_weight_cache_lock = threading.Lock()
+
+
+def load_census_targets() -> Dict[str, Dict[str, float]]:
+    global _census_targets
+    if _census_targets is None:
+        with _census_lock:
+            if _census_targets is None:
+                file_path = os.path.join(Config.DATA_DIR, 'census_demographic_data.csv')
+                targets = {}
+                with open(file_path, newline='') as file:
+                    for row in csv.DictReader(file):
+                        targets.setdefault(row['DemographicVariable'], {})[row['Category']] = float(row['Proportion'])
+                _census_targets = targets
+                logger.info(f"Census targets loaded for {len(targets)} demographic variables")
+    return _census_targets
+
+
+def _sample_key(rows: np.ndarray, variables: Sequence[str], tolerance: float, max_iterations: int) -> str:
+    digest = hashlib.sha1(np.ascontiguousarray(rows, dtype=np.int64).tobytes())
+    digest.update(repr((tuple(variables), tolerance, max_iterations)).encode())
+    return digest.hexdigest()
+
+
+def rake(store: ProfileStore, rows: np.ndarray, targets: Dict[str, Dict[str, float]],
+         variables: Sequence[str], tolerance: float, max_iterations: int) -> np.ndarray:
+    """Iterative proportional fitting of respondent weights to target marginals.
+
+    Each pass rescales weights so one variable's weighted distribution matches
+    its target. Respondents whose value has no target category are left out of
+    that variable's adjustment. Returns weights normalized to mean 1.
+    """
+    rows = np.asarray(rows)
+    weights = np.ones(len(rows))
+    margins = []
+    for variable in variables:
+        if variable not in targets:
+            logger.warning(f"No census targets for {variable}, skipping")
+            continue
+        categories = list(targets[variable])
+        codes = store.encode(variable, categories)[rows]
+        present = np.bincount(codes[codes >= 0], minlength=len(categories)) > 0
+        target = np.array([targets[variable][c] for c in categories]) * present
+        if target.sum() == 0:
+            continue
+        margins.append((variable, codes, codes >= 0, target / target.sum()))
+
+    for iteration in range(1, max_iterations + 1):
+        max_error = 0.0
+        for variable, codes, matched, target in margins:
+            totals = np.bincount(codes[matched], weights=weights[matched], minlength=len(target))
+            matched_total = totals.sum()
+            shares = totals / matched_total
+            max_error = max(max_error, np.abs(shares - target).max())
+            factors = np.divide(target * matched_total, totals, out=np.ones_like(totals), where=totals > 0)
+            weights[matched] *= factors[codes[matched]]
+        if max_error < tolerance:
+            break
+    else:
+        logger.warning(f"Raking did not converge after {max_iterations} iterations (max error {max_error:.2e})")
+    logger.debug(f"Raking finished after {iteration} iterations on {[m[0] for m in margins]}")
+    return weights / weights.mean()
+
+
+def calculate_weights(store: ProfileStore, rows: np.ndarray, variables: Optional[List[str]] = None,
+                      targets: Optional[Dict[str, Dict[str, float]]] = None, use_cache: bool = True) -> np.ndarray:
+    if variables is None:
+        variables = Config.RAKING_VARIABLES
+    tolerance = Config.RAKING_TOLERANCE
+    max_iterations = Config.RAKING_MAX_ITERATIONS
+    # Custom targets are not part of the key, so only census-targeted weights are cached
+    key = _sample_key(rows, variables, tolerance, max_iterations) if targets is None and use_cache else None
+
+    if key is not None:
+        with _weight_cache_lock:
+            cached = _weight_cache.get(key)
+            if cached is not None:
+                _weight_cache.move_to_end(key)
+                return cached
+
+    weights = rake(store, rows, targets or load_census_targets(), variables, tolerance, max_iterations)
+    weights.flags.writeable = False
+
+    if key is not None:
+        with _weight_cache_lock:
+            _weight_cache[key] = weights
+            while len(_weight_cache) > Config.WEIGHT_CACHE_SIZE:
+                _weight_cache.popitem(last=False)
+    return weights
@@ -0,0 +1,118 @@
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import sqlite3
+
+# Encode/decode time and stored size of SurveyData payloads under each codec: the old json.dumps text,
+# msgspec JSON and MessagePack, each with and without zlib. Payloads are synthetic survey_results rows,
+# with packed and expanded individual responses, plus every SurveyData row of a database given with --db.
+#
+#   python benchmark_codec.py --respondents 1000 --db instance/app.db
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+
+from backend.api import survey_codec  # noqa: E402
+
+OPTIONS = ['Strongly agree', 'Somewhat agree', 'Neither agree nor disagree', 'Somewhat disagree', 'Strongly disagree']
+DEMOGRAPHICS = {
+    'Gender': ['Male', 'Female'],
+    'Age': ['18-29', '30-44', '45-64', '65+'],
+    'Race': ['White', 'Black', 'Hispanic', 'Asian', 'Other', 'Mixed Race'],
+    'Education': ['High school or less', 'Some college', 'Bachelor', 'Postgraduate'],
+    'GeographicRegion': ['Northeast', 'Midwest', 'South', 'West']
+}
+
+
+def survey_results(respondents, expanded, rng):
+    crosstabs = {variable: {group: {'n': rng.randrange(respondents),
+                                    'percentages': {option: rng.uniform(0, 100) for option in OPTIONS}}
+                            for group in groups}
+                 for variable, groups in DEMOGRAPHICS.items()}
+    if expanded:
+        individual = [{'demographics': {variable: rng.choice(groups) for variable, groups in DEMOGRAPHICS.items()},
+                       'response': rng.choice(OPTIONS), 'weight': rng.uniform(0.2, 3)}
+                      for _ in range(respondents)]
+    else:
+        # Same shape as packed_responses.pack_responses, with random bytes standing in for the arrays
+        import base64
+        individual = {'format': 'packed-v1', 'snapshot_version': 'bench', 'count': respondents, 'options': OPTIONS,
+                      'profile_ids': base64.b64encode(os.urandom(4 * respondents)).decode('ascii'),
+                      'answers': base64.b64encode(os.urandom(2 * respondents)).decode('ascii'),
+                      'weights': base64.b64encode(os.urandom(4 * respondents)).decode('ascii')}
+    return {
+        'seed': rng.randrange(2 ** 31),
+        'aggregate_results': {'question': 'How much do you agree?', 'type': 'likert',
+                              'answers': [{'text': option, 'label': option, 'percentage': rng.uniform(0, 100),
+                                           'ci_low': rng.uniform(0, 50), 'ci_high': rng.uniform(50, 100),
+                                           'margin_of_error': rng.uniform(0, 5)} for option in OPTIONS]},
+        'crosstabs': crosstabs,
+        'individual_responses': individual
+    }
+
+
+def database_payloads(db_path):
+    conn = sqlite3.connect(db_path)
+    has_codec = any(row[1] == 'codec' for row in conn.execute("PRAGMA table_info(content_blob)"))
+    if has_codec:
+        rows = conn.execute("SELECT s.data_type, b.codec, COALESCE(b.data, b.content), s.content FROM survey_data s "
+                            "LEFT JOIN content_blob b ON b.hash = s.blob_hash").fetchall()
+    else:
+        rows = conn.execute("SELECT s.data_type, 'json', b.content, s.content FROM survey_data s "
+                            "LEFT JOIN content_blob b ON b.hash = s.blob_hash").fetchall()
+    conn.close()
+    return [(f"db:{data_type}", survey_codec.decode(codec, blob if blob is not None else inline))
+            for data_type, codec, blob, inline in rows]
+
+
+def measure(value, codec, threshold, repeat):
+    if codec == 'stdlib':
+        encode = lambda: json.dumps(value).encode('utf-8')
+        decode = lambda data: json.loads(data)
+    else:
+        encode = lambda: survey_codec.encode(value, codec, threshold)
+        decode = lambda stored: survey_codec.decode(*stored)
+    started = time.perf_counter()
+    for _ in range(repeat):
+        stored = encode()
+    encode_time = (time.perf_counter() - started) / repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        decode(stored)
+    decode_time = (time.perf_counter() - started) / repeat
+    size = len(stored) if codec == 'stdlib' else len(stored[1])
+    return encode_time, decode_time, size
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Compare SurveyData codecs on encode/decode time and stored size')
+    parser.add_argument('--respondents', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=50)
+    parser.add_argument('--threshold', type=int, default=None,
+                        help='compression threshold in bytes (defaults to SURVEY_DATA_COMPRESS_THRESHOLD)')
+    parser.add_argument('--db', help='also measure every SurveyData row of this SQLite database')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    payloads = [('survey_results packed', survey_results(args.respondents, False, rng)),
+                ('survey_results expanded', survey_results(args.respondents, True, rng))]
+    if args.db:
+        payloads.extend(database_payloads(args.db))
+
+    variants = [('json.dumps', 'stdlib', 0),
+                ('msgspec json', survey_codec.JSON, 0),
+                ('msgspec json+zlib', survey_codec.JSON, args.threshold),
+                ('msgpack', survey_codec.MSGPACK, 0),
+                ('msgpack+zlib', survey_codec.MSGPACK, args.threshold)]
+    print(f"{'payload':<28}{'codec':<20}{'encode ms':>10}{'decode ms':>10}{'bytes':>10}{'vs json':>9}")
+    for name, value in payloads:
+        baseline = None
+        for label, codec, threshold in variants:
+            encode_time, decode_time, size = measure(value, codec, threshold, args.repeat)
+            baseline = baseline or size
+            print(f"{name:<28}{label:<20}{encode_time * 1000:>10.3f}{decode_time * 1000:>10.3f}{size:>10}"
+                  f"{size / baseline:>9.2f}")
@@ -0,0 +1,125 @@
+import os
+import sys
+import json
+import logging
+import time
+import random
+import argparse
+import tempfile
+import threading
+import multiprocessing
+
+# Concurrent SurveyData.save_data / get_data throughput against one SQLite file, the way several
+# gunicorn workers with a few threads each would hit it. Runs once with default SQLite settings
+# and once in managed mode (WAL, busy timeout, tuned pragmas and pool), each on a fresh database.
+#
+#   python benchmark_sqlite.py --processes 4 --threads 4 --seconds 10
+
+script_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, script_dir)
+
+
+def configure(db_path, managed):
+    # Must run before the app package is imported, since Config reads the environment at import
+    os.environ['DATABASE_URL'] = f'sqlite:///{db_path}'
+    os.environ['SQLITE_MANAGED'] = 'true' if managed else 'false'
+    os.environ['SURVEY_DATA_CACHE_SIZE'] = '0'  # measure the database, not the read cache
+    os.environ.setdefault('OPENAI_API_KEY', 'benchmark')
+    logging.disable(logging.CRITICAL)
+
+
+def worker(db_path, managed, threads, seconds, read_ratio, sessions, results):
+    configure(db_path, managed)
+    from backend.api import create_app
+    from backend.api.models import SurveyData
+    app = create_app()
+
+    def run(thread_id):
+        rng = random.Random(f"{os.getpid()}-{thread_id}")
+        counts = {'reads': 0, 'writes': 0, 'errors': 0}
+        latencies = []
+        deadline = time.monotonic() + seconds
+        with app.app_context():
+            while time.monotonic() < deadline:
+                session_id = f"session-{rng.randrange(sessions)}"
+                started = time.monotonic()
+                try:
+                    if rng.random() < read_ratio:
+                        if SurveyData.get_data(session_id, 'survey_results', 'bench') is None:
+                            counts['errors'] += 1
+                        counts['reads'] += 1
+                    else:
+                        payload = {'seed': rng.random(), 'answers': [rng.random() for _ in range(200)]}
+                        SurveyData.save_data('bench', session_id, 'survey_results', payload)
+                        counts['writes'] += 1
+                except Exception:
+                    counts['errors'] += 1
+                latencies.append(time.monotonic() - started)
+        results.put((counts, latencies))
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+
+def seed_database(db_path, managed, sessions):
+    configure(db_path, managed)
+    from backend.api import create_app, db
+    from backend.api.models import SurveyData
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        for i in range(sessions):
+            SurveyData.save_data('bench', f"session-{i}", 'survey_results', {'seed': i, 'answers': []})
+
+
+def run_mode(managed, args):
+    db_path = os.path.join(tempfile.mkdtemp(prefix='voxbox-bench-'), 'bench.db')
+    # Seeding happens in a child too, so each mode imports Config with its own environment
+    seeder = multiprocessing.Process(target=seed_database, args=(db_path, managed, args.sessions))
+    seeder.start()
+    seeder.join()
+
+    results = multiprocessing.Queue()
+    processes = [multiprocessing.Process(target=worker, args=(db_path, managed, args.threads, args.seconds,
+                                                              args.read_ratio, args.sessions, results))
+                 for _ in range(args.processes)]
+    for process in processes:
+        process.start()
+    totals = {'reads': 0, 'writes': 0, 'errors': 0}
+    latencies = []
+    for _ in range(args.processes * args.threads):
+        counts, thread_latencies = results.get()
+        for name in totals:
+            totals[name] += counts[name]
+        latencies.extend(thread_latencies)
+    for process in processes:
+        process.join()
+
+    latencies.sort()
+    operations = totals['reads'] + totals['writes']
+    return {
+        'mode': 'managed' if managed else 'default',
+        'ops_per_second': round(operations / args.seconds, 1),
+        'writes_per_second': round(totals['writes'] / args.seconds, 1),
+        'reads_per_second': round(totals['reads'] / args.seconds, 1),
+        'errors': totals['errors'],
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Concurrent SurveyData throughput, default vs managed SQLite')
+    parser.add_argument('--processes', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--read-ratio', type=float, default=0.7)
+    parser.add_argument('--sessions', type=int, default=200)
+    args = parser.parse_args()
+
+    multiprocessing.set_start_method('spawn')
+    for managed in (False, True):
+        print(json.dumps(run_mode(managed, args)))
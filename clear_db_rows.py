@@ -26,18 +26,38 @@ try:
     # Get the maximum ROWID you want to keep
     max_rowid_to_keep = 190  # Adjust this value as needed
 
+    # Release the content blobs referenced by the rows about to go
+    release_query = """
+    UPDATE content_blob
+    SET refcount = refcount - (
+        SELECT COUNT(*) FROM survey_data
+        WHERE survey_data.blob_hash = content_blob.hash
+        AND survey_data.ROWID <= (SELECT MAX(ROWID) - ? FROM survey_data)
+    )
+    """
+
     # Execute DELETE command
     delete_query = """
     DELETE FROM survey_data
     WHERE ROWID <= (SELECT MAX(ROWID) - ? FROM survey_data)
     """
 
+    has_blobs = cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='content_blob'").fetchone()
+    if has_blobs:
+        cursor.execute(release_query, (max_rowid_to_keep,))
+
     cursor.execute(delete_query, (max_rowid_to_keep,))
+    deleted = cursor.rowcount
+
+    # Drop blobs no remaining row points at
+    if has_blobs:
+        cursor.execute("DELETE FROM content_blob WHERE refcount <= 0")
+        print(f"Deleted {cursor.rowcount} unreferenced content blobs.")
 
     # Commit the changes
     conn.commit()
 
-    print(f"Deleted {cursor.rowcount} rows.")
+    print(f"Deleted {deleted} rows.")
 
     # Optionally, vacuum the database
     cursor.execute("VACUUM")
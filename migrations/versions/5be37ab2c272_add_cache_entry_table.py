@@ -0,0 +1,39 @@
+"""Add cache_entry table
+
+Revision ID: 5be37ab2c272
+Revises: d75f61645f75
+Create Date: 2026-10-18 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5be37ab2c272'
+down_revision = 'd75f61645f75'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('cache_entry',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('namespace', sa.String(length=50), nullable=False),
+    sa.Column('key', sa.String(length=64), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    sa.Column('hits', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('namespace', 'key', name='uq_cache_namespace_key')
+    )
+    with op.batch_alter_table('cache_entry', schema=None) as batch_op:
+        batch_op.create_index('idx_cache_namespace_last_used', ['namespace', 'last_used_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('cache_entry', schema=None) as batch_op:
+        batch_op.drop_index('idx_cache_namespace_last_used')
+
+    op.drop_table('cache_entry')
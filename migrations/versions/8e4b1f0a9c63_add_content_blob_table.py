@@ -0,0 +1,51 @@
+"""Add content_blob table and SurveyData blob references
+
+Revision ID: 8e4b1f0a9c63
+Revises: 3c2d88e52e52
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8e4b1f0a9c63'
+down_revision = '3c2d88e52e52'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('content_blob',
+    sa.Column('hash', sa.String(length=64), nullable=False),
+    sa.Column('content', sa.Text(), nullable=False),
+    sa.Column('size', sa.Integer(), nullable=False),
+    sa.Column('refcount', sa.Integer(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('hash')
+    )
+    with op.batch_alter_table('content_blob', schema=None) as batch_op:
+        batch_op.create_index('idx_blob_refcount', ['refcount'], unique=False)
+
+    with op.batch_alter_table('survey_data', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('blob_hash', sa.String(length=64), nullable=True))
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=True)
+        batch_op.create_index(batch_op.f('ix_survey_data_blob_hash'), ['blob_hash'], unique=False)
+        batch_op.create_foreign_key('fk_survey_data_blob_hash', 'content_blob', ['blob_hash'], ['hash'])
+
+
+def downgrade():
+    # Inline the blob payloads again before dropping the references
+    op.execute("UPDATE survey_data SET content = (SELECT content FROM content_blob WHERE content_blob.hash = survey_data.blob_hash) "
+               "WHERE blob_hash IS NOT NULL")
+    with op.batch_alter_table('survey_data', schema=None) as batch_op:
+        batch_op.drop_constraint('fk_survey_data_blob_hash', type_='foreignkey')
+        batch_op.drop_index(batch_op.f('ix_survey_data_blob_hash'))
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('blob_hash')
+
+    with op.batch_alter_table('content_blob', schema=None) as batch_op:
+        batch_op.drop_index('idx_blob_refcount')
+
+    op.drop_table('content_blob')
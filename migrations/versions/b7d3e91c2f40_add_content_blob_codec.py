@@ -0,0 +1,45 @@
+"""Add codec and binary data columns to content_blob
+
+Revision ID: b7d3e91c2f40
+Revises: 8e4b1f0a9c63
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+import json
+import zlib
+from alembic import op
+import msgspec
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e91c2f40'
+down_revision = '8e4b1f0a9c63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing blobs hold JSON text, which the 'json' tag decodes as before
+    with op.batch_alter_table('content_blob', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('codec', sa.String(length=16), nullable=False, server_default='json'))
+        batch_op.add_column(sa.Column('data', sa.LargeBinary(), nullable=True))
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=True)
+
+
+def downgrade():
+    # Turn binary payloads back into JSON text before dropping the columns
+    connection = op.get_bind()
+    blobs = connection.execute(sa.text("SELECT hash, codec, data FROM content_blob WHERE data IS NOT NULL")).fetchall()
+    for digest, codec, data in blobs:
+        if codec.endswith('+zlib'):
+            codec, data = codec[:-len('+zlib')], zlib.decompress(data)
+        value = msgspec.msgpack.decode(data) if codec == 'msgpack' else msgspec.json.decode(data)
+        content = json.dumps(value)
+        connection.execute(sa.text("UPDATE content_blob SET content = :content, size = :size WHERE hash = :hash"),
+                           {"content": content, "size": len(content), "hash": digest})
+
+    with op.batch_alter_table('content_blob', schema=None) as batch_op:
+        batch_op.alter_column('content', existing_type=sa.Text(), nullable=False)
+        batch_op.drop_column('data')
+        batch_op.drop_column('codec')
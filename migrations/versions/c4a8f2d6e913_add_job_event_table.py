@@ -0,0 +1,37 @@
+"""Add job_event table
+
+Revision ID: c4a8f2d6e913
+Revises: b7d3e91c2f40
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4a8f2d6e913'
+down_revision = 'b7d3e91c2f40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_event',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('job_id', sa.String(length=36), nullable=False),
+    sa.Column('event', sa.String(length=50), nullable=False),
+    sa.Column('data', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['job_id'], ['job.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_event', schema=None) as batch_op:
+        batch_op.create_index('idx_job_event_job_id', ['job_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_event', schema=None) as batch_op:
+        batch_op.drop_index('idx_job_event_job_id')
+
+    op.drop_table('job_event')
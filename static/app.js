@@ -77,6 +77,8 @@ document.addEventListener('DOMContentLoaded', () => {
     });
 
     approveQuestionBtn.addEventListener('click', async () => {
+        document.getElementById('loading-progress').textContent = '';
+        analysisStreaming = false;
         showView(views.loading);
         try {
             const results = await conductSurvey();
@@ -132,7 +134,94 @@ document.addEventListener('DOMContentLoaded', () => {
         if (!response.ok) {
             throw new Error('Failed to conduct survey');
         }
-        return response.json();
+        const data = await response.json();
+        // The survey runs as a background job; older servers answer synchronously
+        if (!data.job_id) {
+            return data;
+        }
+        const job = await waitForJob(data);
+        if (job.status !== 'succeeded') {
+            throw new Error(job.error || 'Survey job failed');
+        }
+        return job.result;
+    }
+
+    const stageMessages = {
+        question_config: 'Picked the demographics that matter...',
+        survey_results: 'Polled the nation...',
+        save_results: 'Filed the paperwork...',
+        analysis: 'Our analysts have weighed in...'
+    };
+
+    function showProgress(event) {
+        const progress = document.getElementById('loading-progress');
+        if (event.event === 'stage_done' && stageMessages[event.stage]) {
+            progress.textContent = stageMessages[event.stage];
+        } else if (event.event === 'analysis_field' || event.event === 'analysis_item') {
+            showAnalysisPart(event);
+        }
+    }
+
+    // The analysis streams in piece by piece; show the results view as soon as the first piece lands
+    let analysisStreaming = false;
+
+    function showAnalysisPart(event) {
+        if (!analysisStreaming) {
+            analysisStreaming = true;
+            clearResults();
+            showView(views.results);
+        }
+        if (event.event === 'analysis_item') {
+            renderPerson(event.index, event.value);
+        } else if (event.field === 'key_finding') {
+            document.getElementById('key-finding-text').textContent = event.value;
+        } else if (event.field === 'quick_stats') {
+            renderQuickStats(event.value);
+        } else if (event.field === 'fun_fact') {
+            document.getElementById('fun-fact-text').textContent = event.value;
+        }
+    }
+
+    function waitForJob(job) {
+        // The server only offers an event stream when it runs workers that can hold one open
+        if (!job.events_url || !window.EventSource) {
+            return pollJob(job.status_url);
+        }
+        return new Promise((resolve, reject) => {
+            const source = new EventSource(job.events_url);
+            source.addEventListener('progress', (e) => showProgress(JSON.parse(e.data)));
+            source.addEventListener('done', (e) => {
+                source.close();
+                resolve(JSON.parse(e.data));
+            });
+            source.addEventListener('timeout', () => {
+                source.close();
+                pollJob(job.status_url).then(resolve, reject);
+            });
+            source.onerror = () => {
+                // Fall back to polling if the stream breaks (proxies, worker restarts)
+                source.close();
+                pollJob(job.status_url).then(resolve, reject);
+            };
+        });
+    }
+
+    async function pollJob(statusUrl) {
+        let seen = 0;
+        while (true) {
+            // Only ask for the progress events not shown yet
+            const response = await fetch(`${statusUrl}?after=${seen}`);
+            if (!response.ok) {
+                throw new Error('Failed to fetch survey job');
+            }
+            const job = await response.json();
+            (job.progress || []).forEach(showProgress);
+            seen += (job.progress || []).length;
+            if (job.status === 'succeeded' || job.status === 'failed') {
+                return job;
+            }
+            await new Promise(r => setTimeout(r, 1000));
+        }
     }
 
     // Display functions
@@ -141,31 +230,59 @@ document.addEventListener('DOMContentLoaded', () => {
         document.getElementById('refined-question').textContent = `Refined question: ${data.transformed_question.question}`;
     }
 
-    function displayResults(data) {
-        // Display key finding
-        document.getElementById('key-finding-text').textContent = data.analysis.key_finding;
+    function clearResults() {
+        document.getElementById('key-finding-text').textContent = '';
+        document.getElementById('quick-stats-list').innerHTML = '';
+        document.getElementById('in-their-voices-text').innerHTML = '';
+        document.getElementById('fun-fact-text').textContent = '';
 
-        // Prepare quick stats
+        // Show reveal button, hide additional results and "Let's Go Again" button
+        revealButton.classList.remove('hidden');
+        additionalResults.classList.add('hidden');
+        newQuestionBtn.classList.add('hidden');
+    }
+
+    function renderQuickStats(stats) {
         const quickStatsList = document.getElementById('quick-stats-list');
         quickStatsList.innerHTML = '';
-        data.analysis.quick_stats.forEach(stat => {
+        stats.forEach(stat => {
             const li = document.createElement('li');
             li.textContent = stat;
             quickStatsList.appendChild(li);
         });
+    }
+
+    function renderPerson(index, person) {
+        // Keyed by index, so replayed progress events redraw instead of duplicating
+        const inTheirVoicesContainer = document.getElementById('in-their-voices-text');
+        while (inTheirVoicesContainer.children.length <= index) {
+            inTheirVoicesContainer.appendChild(document.createElement('div'));
+        }
+        inTheirVoicesContainer.children[index].innerHTML = `
+            <p><strong>${person.name}, ${person.age}</strong> - ${person.description}</p>
+            <p><em>"${person.quote}"</em></p>
+        `;
+    }
+
+    function displayResults(data) {
+        // Streamed parts are already on screen; keep the reveal state the user left them in
+        if (analysisStreaming) {
+            analysisStreaming = false;
+        } else {
+            clearResults();
+        }
+
+        // Display key finding
+        document.getElementById('key-finding-text').textContent = data.analysis.key_finding;
+
+        // Prepare quick stats
+        renderQuickStats(data.analysis.quick_stats);
 
         // Display in their voices (formerly deep thoughts)
         const inTheirVoicesContainer = document.getElementById('in-their-voices-text');
-        inTheirVoicesContainer.innerHTML = ''; // Clear previous content
         if (Array.isArray(data.analysis.interpretation)) {
-            data.analysis.interpretation.forEach(person => {
-                const personDiv = document.createElement('div');
-                personDiv.innerHTML = `
-                    <p><strong>${person.name}, ${person.age}</strong> - ${person.description}</p>
-                    <p><em>"${person.quote}"</em></p>
-                `;
-                inTheirVoicesContainer.appendChild(personDiv);
-            });
+            inTheirVoicesContainer.innerHTML = '';
+            data.analysis.interpretation.forEach((person, index) => renderPerson(index, person));
         } else {
             inTheirVoicesContainer.textContent = "No interpretation data available.";
         }
@@ -173,11 +290,6 @@ document.addEventListener('DOMContentLoaded', () => {
         // Display fun fact
         document.getElementById('fun-fact-text').textContent = data.analysis.fun_fact;
 
-        // Show reveal button, hide additional results and "Let's Go Again" button
-        revealButton.classList.remove('hidden');
-        additionalResults.classList.add('hidden');
-        newQuestionBtn.classList.add('hidden');
-
         // Trigger confetti
         confetti({
             particleCount: 100,
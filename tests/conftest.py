@@ -0,0 +1,6 @@
+import os
+import sys
+
+# Config reads the environment at import; tests never reach the real API
+os.environ.setdefault('OPENAI_API_KEY', 'test')
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
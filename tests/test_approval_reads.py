@@ -0,0 +1,59 @@
+import datetime
+
+import pytest
+from sqlalchemy import event
+
+from backend.api import create_app, db, llm_providers, llm_standin
+from backend.api.config import Config
+from backend.api.models import SurveyData
+from backend.api.survey_data_cache import survey_data_cache
+
+
+class CannedProvider(llm_providers.LLMProvider):
+    name = 'canned'
+
+    def generate(self, assistant, prompt, timeout=None):
+        return llm_standin.canned_response(assistant, prompt), None
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(Config, 'SQLALCHEMY_DATABASE_URI', f"sqlite:///{tmp_path / 'app.db'}")
+    monkeypatch.setattr(Config, 'SESSION_FILE_DIR', str(tmp_path / 'flask_session'))
+    # Only the identity map; the cross-request LRU would hide repeated reads
+    monkeypatch.setattr(survey_data_cache, 'max_entries', 0)
+    monkeypatch.setattr(llm_providers, '_provider', CannedProvider())
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session.update(user_id='u', session_id='s', last_activity=datetime.datetime.utcnow())
+    with app.app_context():
+        SurveyData.save_data('u', 's', 'original_question', 'should cities ban cars downtown')
+        SurveyData.save_data('u', 's', 'transformed_question', llm_standin.canned_transformation(
+            'User input: "should cities ban cars downtown"'))
+    yield app, client
+    with app.app_context():
+        db.engine.dispose()
+
+
+def test_sync_approval_reads_each_payload_once(client):
+    app, client = client
+    statements = []
+    with app.app_context():
+        engine = db.engine
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT') and 'FROM survey_data' in statement:
+            statements.append(parameters)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.post('/approve-question', json={"approved": True, "sync": True, "seed": 7})
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200, response.json
+    # transformed_question and original_question, read by the route and shared with every stage;
+    # question_config and survey_results are written inside the run and read back from its unit of work
+    assert len(statements) == 2
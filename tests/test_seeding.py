@@ -0,0 +1,17 @@
+import pytest
+from backend.api.seeding import SEED_BITS, new_run_seed, parse_seed
+
+
+def test_new_seeds_fit_the_accepted_range():
+    assert all(parse_seed(new_run_seed()) is not None for _ in range(100))
+
+
+@pytest.mark.parametrize('value, expected', [(None, None), (0, 0), (42, 42), ('42', 42), (2 ** SEED_BITS - 1, 2 ** SEED_BITS - 1)])
+def test_parse_seed_accepts(value, expected):
+    assert parse_seed(value) == expected
+
+
+@pytest.mark.parametrize('value', ['abc', 1.5e30, 1.0, -1, True, 2 ** SEED_BITS, '8601202762401399184', [], {}])
+def test_parse_seed_rejects(value):
+    with pytest.raises(ValueError):
+        parse_seed(value)
@@ -0,0 +1,41 @@
+import numpy as np
+import pytest
+
+from backend.api.config import Config
+from backend.api.create_question_config import DEMOGRAPHIC_VARIABLES
+from backend.api.profile_store import get_profile_store
+from backend.api.strata import quota_sample
+from backend.api.weighting import load_census_targets
+
+
+def composition(variables, rng):
+    # A question_config composition: a random share for each category of a few variables
+    return {variable: dict(zip(categories, rng.dirichlet(np.full(len(categories), 5.0))))
+            for variable, categories in ((v, DEMOGRAPHIC_VARIABLES[v]) for v in variables)}
+
+
+def assert_marginals_within_one(store, rows, targets, num_respondents):
+    assert len(rows) == num_respondents
+    for variable, shares in targets.items():
+        categories = list(shares)
+        realized = np.bincount(store.encode(variable, categories)[rows], minlength=len(categories))
+        total = sum(shares.values())
+        expected = np.array([shares[category] / total * num_respondents for category in categories])
+        assert np.abs(realized - expected).max() <= 1, (variable, realized.tolist(), expected.round(2).tolist())
+
+
+@pytest.mark.parametrize('num_respondents', [10, 100, 300, 1000])
+def test_census_quotas_keep_every_marginal(num_respondents):
+    store = get_profile_store()
+    targets = {variable: load_census_targets()[variable] for variable in Config.QUOTA_VARIABLES}
+    rows = quota_sample(store, num_respondents, targets, rng=np.random.default_rng(0))
+    assert_marginals_within_one(store, rows, targets, num_respondents)
+
+
+@pytest.mark.parametrize('seed', range(5))
+@pytest.mark.parametrize('num_respondents', [50, 100, 300])
+def test_question_config_quotas_keep_every_marginal(seed, num_respondents):
+    store = get_profile_store()
+    targets = composition(['Gender', 'Age', 'Education', 'GeographicRegion'], np.random.default_rng(seed))
+    rows = quota_sample(store, num_respondents, targets, rng=np.random.default_rng(seed))
+    assert_marginals_within_one(store, rows, targets, num_respondents)
@@ -0,0 +1,24 @@
+import json
+import random
+from backend.api.streaming_json import IncrementalJSONParser
+
+
+def feed_in_chunks(parser, text, rng):
+    events, i = [], 0
+    while i < len(text):
+        size = rng.randint(1, 7)
+        events += parser.feed(text[i:i + size])
+        i += size
+    return events
+
+
+def test_mixed_item_array_keeps_indices():
+    doc = {"items": [1, "two", {"three": [3]}, None, -4.5e2, True, ["six"], "seven, ]"], "after": 8}
+    rng = random.Random(0)
+    for indent in (None, 2):
+        text = "```json\n" + json.dumps(doc, indent=indent) + "\n```"
+        for _ in range(100):
+            events = feed_in_chunks(IncrementalJSONParser(item_keys=('items',)), text, rng)
+            items = [event for event in events if event[0] == 'item']
+            assert [(event[2], event[3]) for event in items] == list(enumerate(doc['items']))
+            assert {event[1]: event[2] for event in events if event[0] == 'field'} == doc